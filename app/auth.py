@@ -1,7 +1,8 @@
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt
-from passlib.context import CryptContext
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,13 +11,66 @@ SECRET_KEY = os.getenv("SECRET_KEY", "changeme123")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60*24*7))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt es CPU puro (~250 ms por operación). Se ejecuta en un pool de procesos
+# para no retener el GIL del worker; HASH_WORKERS=0 lo ejecuta en línea.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", 2))
+# Máximo de operaciones de hash en curso o en cola. Acota los hilos del
+# threadpool que pueden quedar esperando un hash durante una ráfaga de logins.
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", 16))
+
+_pwd_context = None
+
+class HashQueueFull(Exception):
+    pass
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(max(HASH_MAX_PENDING, 1))
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+        return _hash_pool
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+def _run_hash(fn, *args):
+    if HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _hash_slots.acquire(blocking=False):
+        raise HashQueueFull()
+    try:
+        return _get_hash_pool().submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
+
+def _get_pwd_context():
+    # passlib y bcrypt se importan con el primer hash, no al arrancar: con la
+    # base ya sembrada el arranque no hashea nada
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+def _hash(password: str) -> str:
+    return _get_pwd_context().hash(password)
+
+def _verify(plain: str, hashed: str) -> bool:
+    return _get_pwd_context().verify(plain, hashed)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _run_hash(_hash, password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return _run_hash(_verify, plain, hashed)
 
 def create_access_token(subject: int | str, expires_delta: timedelta = None):
     to_encode = {"sub": str(subject)}
@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from sqlmodel import select
+from app.cache import TTLCache
+from app.models import CatalogVersion
+from app.pagination import NEXT_CURSOR_HEADER
+
+# Segundos que un worker confía en su copia de la versión antes de releerla.
+# Acota cuánto tarda un worker en ver una escritura hecha por otro.
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", 1.0))
+
+class _VersionCache:
+    def __init__(self):
+        self.value: Optional[int] = None
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def cached(self) -> Optional[int]:
+        with self._lock:
+            if self.value is not None and time.monotonic() - self.loaded_at < CATALOG_VERSION_TTL:
+                return self.value
+            return None
+
+    def load(self, session) -> int:
+        version = session.exec(select(CatalogVersion.version).where(CatalogVersion.id == 1)).one()
+        with self._lock:
+            self.value, self.loaded_at = version, time.monotonic()
+        return version
+
+    def expire(self):
+        with self._lock:
+            self.value = None
+
+catalog_version = _VersionCache()
+
+def bump_catalog_version(session):
+    # Dentro de la transacción del llamador; tras el commit llamar a catalog_version.expire()
+    session.execute(
+        update(CatalogVersion.__table__)
+        .where(CatalogVersion.__table__.c.id == 1)
+        .values(version=CatalogVersion.__table__.c.version + 1)
+    )
+
+# (ruta, query, versión) -> cuerpo serializado, cuerpo gzip y cabeceras
+catalog_responses = TTLCache("catalog", maxsize=int(os.getenv("CATALOG_CACHE_SIZE", 256)), ttl=3600)
+
+def _query_key(request: Request) -> str:
+    return "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+def _etag_base(request: Request, version: int) -> str:
+    # Depende solo de la versión y la consulta: cualquier worker puede
+    # responder 304 sin haber renderizado antes el listado.
+    digest = hashlib.sha1(f"{request.url.path}?{_query_key(request)}".encode()).hexdigest()[:16]
+    return f"{version}-{digest}"
+
+def _accepts_gzip(request: Request) -> bool:
+    # Accept-Encoding con pesos: "gzip;q=0" lo rechaza; "*" cubre gzip si no aparece
+    weights = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.lower()] = q
+    q = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return q > 0
+
+def _matches(request: Request, base: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    return f'"{base}"' in tags or f'"{base}-gz"' in tags
+
+def _build(request: Request, base: str, body: bytes, body_gz: bytes, headers: dict) -> Response:
+    headers = dict(headers)
+    headers["Vary"] = "Accept-Encoding"
+    if _accepts_gzip(request):
+        headers["ETag"] = f'"{base}-gz"'
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body_gz, media_type="application/json", headers=headers)
+    headers["ETag"] = f'"{base}"'
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cached_listing(request: Request, version: int) -> Optional[Response]:
+    """304 si el cliente ya tiene esta versión, o el cuerpo ya renderizado si existe."""
+    base = _etag_base(request, version)
+    if _matches(request, base):
+        etag = f'"{base}-gz"' if _accepts_gzip(request) else f'"{base}"'
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+    entry = catalog_responses.get((request.url.path, _query_key(request), version))
+    if entry is None:
+        return None
+    return _build(request, base, *entry)
+
+def store_listing(request: Request, version: int, items: List, source: Response) -> Response:
+    body = json.dumps(jsonable_encoder(items), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    body_gz = gzip.compress(body, compresslevel=6)
+    headers = {}
+    if NEXT_CURSOR_HEADER in source.headers:
+        headers[NEXT_CURSOR_HEADER] = source.headers[NEXT_CURSOR_HEADER]
+    catalog_responses.set((request.url.path, _query_key(request), version), (body, body_gz, headers))
+    return _build(request, _etag_base(request, version), body, body_gz, headers)
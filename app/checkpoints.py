@@ -0,0 +1,116 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import func, insert, literal, union_all
+from sqlmodel import select
+from app.models import Entrada, Salida, SalidaAlmacen, Stock, StockCheckpoint, StockCheckpointFila
+from app.rollups import UNKNOWN_WAREHOUSE
+
+# Un checkpoint nuevo cubre hasta ahora menos este margen, para no dejar fuera
+# movimientos con fecha anterior cuya transacción aún no ha hecho commit
+CHECKPOINT_LAG = timedelta(seconds=int(os.getenv("STOCK_CHECKPOINT_LAG_SECONDS", 60)))
+
+class SinCheckpoint(Exception):
+    pass
+
+def _nearest_checkpoint(session, as_of: datetime) -> Optional[StockCheckpoint]:
+    # El más cercano en el tiempo, anterior o posterior: se reproduce hacia
+    # delante o hacia atrás solo el intervalo que los separa
+    before = session.exec(
+        select(StockCheckpoint).where(StockCheckpoint.fecha <= as_of).order_by(StockCheckpoint.fecha.desc()).limit(1)
+    ).first()
+    after = session.exec(
+        select(StockCheckpoint).where(StockCheckpoint.fecha > as_of).order_by(StockCheckpoint.fecha).limit(1)
+    ).first()
+    if before is None or after is None:
+        return before or after
+    return before if as_of - before.fecha <= after.fecha - as_of else after
+
+def _movements(low: datetime, high: Optional[datetime], sign: int):
+    # Entradas y salidas con fecha en (low, high] (sin high, hasta hoy), con signo: salidas por
+    # almacén con su reparto, o en UNKNOWN_WAREHOUSE si no lo tienen
+    exit_warehouse = func.coalesce(SalidaAlmacen.id_almacen, UNKNOWN_WAREHOUSE)
+    entries = select(
+        Entrada.id_producto, Entrada.id_almacen, Entrada.cantidad * sign,
+    ).where(Entrada.fecha_entrada > low)
+    exits = select(
+        Salida.id_producto, exit_warehouse, func.coalesce(SalidaAlmacen.cantidad, Salida.cantidad) * -sign,
+    ).outerjoin(SalidaAlmacen, SalidaAlmacen.id_salida == Salida.id_salida).where(Salida.fecha_salida > low)
+    if high is not None:
+        entries = entries.where(Entrada.fecha_entrada <= high)
+        exits = exits.where(Salida.fecha_salida <= high)
+    return entries, exits, exit_warehouse
+
+def _sum_stock(*parts):
+    movements = union_all(*parts).subquery()
+    total = func.sum(movements.c.cantidad)
+    return (
+        select(movements.c.id_producto, movements.c.id_almacen, total.label("cantidad"))
+        .group_by(movements.c.id_producto, movements.c.id_almacen)
+        .having(total != 0)
+        .order_by(movements.c.id_producto, movements.c.id_almacen)
+    )
+
+def _stock_at(checkpoint: StockCheckpoint, as_of: datetime, id_producto: Optional[int] = None, id_almacen: Optional[int] = None):
+    """
+    SELECT (id_producto, id_almacen, cantidad) del stock a `as_of`: filas del
+    checkpoint más (o menos, si el checkpoint es posterior) los movimientos
+    entre ambas fechas.
+    """
+    forward = checkpoint.fecha <= as_of
+    low, high = (checkpoint.fecha, as_of) if forward else (as_of, checkpoint.fecha)
+
+    base = select(
+        StockCheckpointFila.id_producto.label("id_producto"),
+        StockCheckpointFila.id_almacen.label("id_almacen"),
+        StockCheckpointFila.cantidad.label("cantidad"),
+    ).where(StockCheckpointFila.id_checkpoint == checkpoint.id_checkpoint)
+    entries, exits, exit_warehouse = _movements(low, high, 1 if forward else -1)
+    if id_producto is not None:
+        base = base.where(StockCheckpointFila.id_producto == id_producto)
+        entries = entries.where(Entrada.id_producto == id_producto)
+        exits = exits.where(Salida.id_producto == id_producto)
+    if id_almacen is not None:
+        base = base.where(StockCheckpointFila.id_almacen == id_almacen)
+        entries = entries.where(Entrada.id_almacen == id_almacen)
+        exits = exits.where(exit_warehouse == id_almacen)
+    return _sum_stock(base, entries, exits)
+
+def _live_stock_at(fecha: datetime):
+    # Stock actual menos los movimientos posteriores a `fecha`. Una sola
+    # sentencia: la copia y lo que se resta salen de la misma instantánea
+    current = select(
+        Stock.id_producto.label("id_producto"),
+        Stock.id_almacen.label("id_almacen"),
+        Stock.cantidad.label("cantidad"),
+    )
+    entries, exits, _ = _movements(fecha, None, -1)
+    return _sum_stock(current, entries, exits)
+
+def stock_as_of(session, as_of: datetime, id_producto: Optional[int] = None, id_almacen: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    checkpoint = _nearest_checkpoint(session, as_of)
+    if checkpoint is None:
+        raise SinCheckpoint()
+    return [tuple(row) for row in session.execute(_stock_at(checkpoint, as_of, id_producto, id_almacen))]
+
+def create_checkpoint(session) -> Optional[StockCheckpoint]:
+    """
+    Crea un checkpoint a ahora menos CHECKPOINT_LAG. El primero parte de la
+    tabla de stock y resta los movimientos posteriores a esa fecha; los
+    siguientes parten del anterior y suman los movimientos del intervalo,
+    con un INSERT ... SELECT cuyo coste depende de esos movimientos.
+    Devuelve None si no ha pasado el margen desde el último. No hace commit.
+    """
+    previous = session.exec(select(StockCheckpoint).order_by(StockCheckpoint.fecha.desc()).limit(1)).first()
+    columns = ["id_checkpoint", "id_producto", "id_almacen", "cantidad"]
+    fecha = datetime.utcnow() - CHECKPOINT_LAG
+    if previous is not None and fecha <= previous.fecha:
+        return None
+    checkpoint = StockCheckpoint(fecha=fecha)
+    session.add(checkpoint)
+    session.flush()
+    stock = (_live_stock_at(fecha) if previous is None else _stock_at(previous, fecha)).subquery()
+    rows = select(literal(checkpoint.id_checkpoint), stock.c.id_producto, stock.c.id_almacen, stock.c.cantidad)
+    checkpoint.filas = session.execute(insert(StockCheckpointFila.__table__).from_select(columns, rows)).rowcount
+    session.add(checkpoint)
+    return checkpoint
@@ -1,18 +1,130 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.metrics import instrument_engine
+from app.pool import TimedAsyncQueuePool, TimedQueuePool, pool_status
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./inventrack.db")
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+# Perfil del pool de conexiones (ambos engines, sync y async)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", 10))
+
+# Pragmas de SQLite aplicados en cada conexión nueva. WAL permite lectores
+# concurrentes con un escritor; NORMAL es seguro en WAL y evita un fsync por commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+}
+
+# Sentencias más lentas que esto (ms) se registran con la ruta que las lanzó; 0 lo desactiva
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def is_sqlite_memory(url: str) -> bool:
+    return is_sqlite(url) and (":memory:" in url or url.split("://", 1)[1] in ("", "/"))
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def _engine_options(url: str, async_mode: bool) -> dict:
+    if is_sqlite(url):
+        connect_args = {"timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000}
+        if not async_mode:
+            connect_args["check_same_thread"] = False
+        if is_sqlite_memory(url):
+            # Base en memoria: el pool por defecto mantiene una única conexión
+            return {"connect_args": connect_args}
+    elif async_mode:
+        connect_args = {"timeout": CONNECT_TIMEOUT}
+    else:
+        connect_args = {"connect_timeout": CONNECT_TIMEOUT}
+    return {
+        "connect_args": connect_args,
+        # SQLAlchemy 1.4 usa NullPool para SQLite en archivo; un pool real
+        # conserva las conexiones (y sus pragmas y mmap) entre peticiones.
+        "poolclass": TimedAsyncQueuePool if async_mode else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, echo=False, **_engine_options(DATABASE_URL, async_mode=False))
+
+# Driver async equivalente al de DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver async para '{scheme}'")
+    return f"{ASYNC_DRIVERS[backend]}://{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, **_engine_options(ASYNC_DATABASE_URL, async_mode=True))
+
+if is_sqlite(DATABASE_URL):
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+if is_sqlite(ASYNC_DATABASE_URL):
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+instrument_engine(engine, SLOW_QUERY_MS)
+instrument_engine(async_engine.sync_engine, SLOW_QUERY_MS)
+
+def pool_stats() -> dict:
+    return {
+        "sync": pool_status(engine, "sync"),
+        "async": pool_status(async_engine.sync_engine, "async"),
+    }
+
+BASE_DIR = Path(__file__).resolve().parent.parent
 
 def init_db():
-    import app.models as models
-    SQLModel.metadata.create_all(engine)
+    # El esquema lo gestionan las migraciones de Alembic (migrations/)
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    # expire_on_commit=False: en async no se puede recargar un atributo de
+    # forma perezosa al serializar la respuesta después del commit.
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
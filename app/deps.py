@@ -1,9 +1,14 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from jose import jwt, JWTError
-from app.database import get_session
-from app.models import Usuario
+from app.cache import TTLCache
+from app.database import async_engine, get_session, get_async_session
+from app.models import Usuario, Rol
 import os
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -11,32 +16,78 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 SECRET_KEY = os.getenv("SECRET_KEY", "changeme123")
 ALGORITHM = "HS256"
 
+@dataclass(frozen=True)
+class Principal:
+    # Identidad mínima del usuario autenticado; es lo que se guarda en caché
+    id_usuario: int
+    nombre_rol: Optional[str] = None
+
+# id_usuario -> Principal. Evita consultar usuario y rol en cada petición.
+principal_cache = TTLCache(
+    "principals",
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", 60)),
+)
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate(user_id)
+
 def get_db():
     yield from get_session()
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_db)) -> Usuario:
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def _resolve_principal(token: str, session: AsyncSession) -> Principal:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id_str = payload.get("sub")
         if user_id_str is None:
-            raise credentials_exception
+            raise _credentials_exception()
         user_id = int(user_id_str)
     except (JWTError, ValueError):
-        raise credentials_exception
+        raise _credentials_exception()
+
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        # Usuario y rol en una sola consulta. Token antes de leer: si un
+        # cambio de usuario o rol invalida la entrada mientras tanto, lo
+        # leído no se guarda
+        token = principal_cache.token()
+        row = (await session.exec(
+            select(Usuario.id_usuario, Rol.nombre_rol)
+            .outerjoin(Rol, Usuario.id_rol == Rol.id_rol)
+            .where(Usuario.id_usuario == user_id)
+        )).first()
+        if not row:
+            raise _credentials_exception()
+        principal = Principal(id_usuario=row[0], nombre_rol=row[1])
+        principal_cache.set(user_id, principal, token=token)
+    return principal
+
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_session)) -> Principal:
+    # async: no ocupa un hilo del threadpool; con la caché caliente no toca la base
+    return await _resolve_principal(token, session)
 
-    user = session.get(Usuario, user_id)
-    if not user:
-        raise credentials_exception
-    return user
+async def get_stream_user(connection: HTTPConnection, token: Optional[str] = Query(None)) -> Principal:
+    # Para WebSocket y SSE: los navegadores no pueden enviar cabeceras en
+    # esas conexiones, así que el token también se acepta como ?token=.
+    # La sesión se cierra enseguida para no retener una conexión del pool
+    # mientras dure el stream.
+    if token is None:
+        scheme, _, credentials = connection.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not credentials:
+            raise _credentials_exception()
+        token = credentials
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        return await _resolve_principal(token, session)
 
-def require_admin(current_user: Usuario = Depends(get_current_user)):
-    # Asumimos que la relación 'rol' está cargada o se carga lazy.
-    # Si es None, no tiene rol, por tanto no es admin.
-    if not current_user.rol or current_user.rol.nombre_rol != "Administrador":
+async def require_admin(current_user: Principal = Depends(get_current_user)):
+    # Sin rol no es admin
+    if current_user.nombre_rol != "Administrador":
         raise HTTPException(status_code=403, detail="No tienes permisos de administrador")
     return current_user
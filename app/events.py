@@ -0,0 +1,128 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from app.stock import StockKey
+
+# Claves (producto, almacén) distintas pendientes por cliente. Los cambios de
+# una clave ya pendiente se suman a ella; si un cliente acumula más claves
+# distintas que esto sin leer, se le desconecta.
+STREAM_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", 1000))
+
+class SlowConsumer(Exception):
+    pass
+
+class Subscription:
+    """
+    Cola acotada de un cliente del stream de stock. Los deltas pendientes se
+    agrupan por (producto, almacén): un cliente lento recibe el cambio neto,
+    no cada movimiento.
+    """
+
+    def __init__(self, broker: "StockBroker", id_producto: Optional[int], id_almacen: Optional[int], max_pending: int):
+        self.broker = broker
+        self.id_producto = id_producto
+        self.id_almacen = id_almacen
+        self.max_pending = max_pending
+        self.dropped = False
+        self._pending: Dict[StockKey, int] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, key: StockKey, delta: int):
+        if key in self._pending:
+            self._pending[key] += delta
+            self.broker.coalesced += 1
+        elif len(self._pending) >= self.max_pending:
+            self.dropped = True
+            self.broker.unsubscribe(self)
+            self.broker.dropped += 1
+        else:
+            self._pending[key] = delta
+        self._ready.set()
+
+    async def next_batch(self) -> List[dict]:
+        # Espera a que haya cambios y devuelve todos los pendientes de una vez
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if self.dropped:
+                raise SlowConsumer()
+            pending, self._pending = self._pending, {}
+            batch = [
+                {"id_producto": p, "id_almacen": a, "delta": delta}
+                for (p, a), delta in pending.items() if delta
+            ]
+            if batch:
+                return batch
+
+class StockBroker:
+    """
+    Pub/sub en proceso de cambios de stock. Los suscriptores se indexan por el
+    filtro más selectivo que tengan, así publicar un cambio solo recorre los
+    interesados en ese producto o almacén y los que no filtran.
+
+    Debe usarse desde el event loop (los handlers de escritura son async).
+    Cada worker solo ve los movimientos que él mismo escribe.
+    """
+
+    def __init__(self):
+        self._all: Set[Subscription] = set()
+        self._by_product: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._by_warehouse: Dict[int, Set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def _bucket(self, sub: Subscription) -> Set[Subscription]:
+        if sub.id_producto is not None:
+            return self._by_product[sub.id_producto]
+        if sub.id_almacen is not None:
+            return self._by_warehouse[sub.id_almacen]
+        return self._all
+
+    def subscribe(self, id_producto: Optional[int] = None, id_almacen: Optional[int] = None, max_pending: int = STREAM_MAX_PENDING) -> Subscription:
+        sub = Subscription(self, id_producto, id_almacen, max_pending)
+        self._bucket(sub).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        bucket = self._bucket(sub)
+        bucket.discard(sub)
+        # No dejar conjuntos vacíos por cada producto o almacén visto
+        if not bucket and bucket is not self._all:
+            if sub.id_producto is not None:
+                self._by_product.pop(sub.id_producto, None)
+            else:
+                self._by_warehouse.pop(sub.id_almacen, None)
+
+    def publish(self, deltas: Dict[StockKey, int]):
+        # Se llama después del commit, con los deltas firmados del movimiento
+        for (p, a), delta in deltas.items():
+            if not delta:
+                continue
+            self.published += 1
+            # Copias: push puede desuscribir a un consumidor lento
+            for sub in list(self._all):
+                sub.push((p, a), delta)
+                self.delivered += 1
+            for sub in list(self._by_warehouse.get(a, ())):
+                sub.push((p, a), delta)
+                self.delivered += 1
+            for sub in list(self._by_product.get(p, ())):
+                if sub.id_almacen is None or sub.id_almacen == a:
+                    sub.push((p, a), delta)
+                    self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._all)
+            + sum(len(s) for s in self._by_product.values())
+            + sum(len(s) for s in self._by_warehouse.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+stock_events = StockBroker()
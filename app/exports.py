@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+from sqlmodel import Session, select
+from app.database import engine
+from app.models import Entrada, Salida, Stock, Producto, Almacen
+
+# Filas que se leen del cursor y se serializan antes de emitir un bloque.
+# La memoria del export queda acotada por este valor, no por el tamaño de la tabla.
+CHUNK_SIZE = 1000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+def stock_query():
+    return (
+        select(
+            Stock.id_stock,
+            Stock.id_producto,
+            Producto.nombre.label("producto"),
+            Stock.id_almacen,
+            Almacen.nombre.label("almacen"),
+            Stock.cantidad,
+        )
+        .outerjoin(Producto, Stock.id_producto == Producto.id_producto)
+        .outerjoin(Almacen, Stock.id_almacen == Almacen.id_almacen)
+        .order_by(Stock.id_stock)
+    )
+
+def entries_query(desde: Optional[datetime] = None, hasta: Optional[datetime] = None):
+    statement = (
+        select(
+            Entrada.id_entrada,
+            Entrada.fecha_entrada,
+            Entrada.id_producto,
+            Producto.nombre.label("producto"),
+            Entrada.id_almacen,
+            Almacen.nombre.label("almacen"),
+            Entrada.id_usuario,
+            Entrada.cantidad,
+            Entrada.observaciones,
+        )
+        .outerjoin(Producto, Entrada.id_producto == Producto.id_producto)
+        .outerjoin(Almacen, Entrada.id_almacen == Almacen.id_almacen)
+        .order_by(Entrada.id_entrada)
+    )
+    if desde is not None:
+        statement = statement.where(Entrada.fecha_entrada >= desde)
+    if hasta is not None:
+        statement = statement.where(Entrada.fecha_entrada < hasta)
+    return statement
+
+def exits_query(desde: Optional[datetime] = None, hasta: Optional[datetime] = None):
+    statement = (
+        select(
+            Salida.id_salida,
+            Salida.fecha_salida,
+            Salida.id_producto,
+            Producto.nombre.label("producto"),
+            Salida.id_usuario,
+            Salida.cantidad,
+            Salida.motivo,
+        )
+        .outerjoin(Producto, Salida.id_producto == Producto.id_producto)
+        .order_by(Salida.id_salida)
+    )
+    if desde is not None:
+        statement = statement.where(Salida.fecha_salida >= desde)
+    if hasta is not None:
+        statement = statement.where(Salida.fecha_salida < hasta)
+    return statement
+
+def _iter_chunks(statement) -> Iterator[tuple]:
+    # Sesión propia: el generador sigue vivo después de que el handler retorna.
+    # stream_results usa un cursor del lado del servidor en PostgreSQL.
+    with Session(engine) as session:
+        result = session.execute(statement.execution_options(stream_results=True))
+        yield tuple(result.keys())
+        for partition in result.partitions(CHUNK_SIZE):
+            yield partition
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _encode_csv(chunks, header) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _encode_ndjson(chunks, header) -> Iterator[bytes]:
+    for rows in chunks:
+        lines = [json.dumps(dict(zip(header, row)), default=_json_default, ensure_ascii=False) for row in rows]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def _gzip(blocks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31 = contenedor gzip
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_rows(statement, fmt: str = "csv", gzip: bool = False, header: Optional[list] = None) -> Iterator[bytes]:
+    """
+    Bloques del export. Es un generador: la consulta se ejecuta al pedir el
+    primer bloque, ya con la respuesta en marcha, así que un error de la
+    base corta el stream en lugar de devolver un 500. Al cerrarlo (fin,
+    error o close_stream) se cierran el cursor y la sesión.
+    """
+    chunks = _iter_chunks(statement)
+    try:
+        columns = next(chunks)
+        encoder = _encode_ndjson if fmt == "ndjson" else _encode_csv
+        blocks = encoder(chunks, header or list(columns))
+        yield from _gzip(blocks) if gzip else blocks
+    finally:
+        chunks.close()
+
+def close_stream(body: Iterator[bytes]):
+    """
+    Tarea de fondo de la StreamingResponse del export. Starlette la ejecuta
+    también cuando el cliente se desconecta y abandona el iterador sin
+    cerrarlo; sin ella la conexión y el cursor quedarían fuera del pool
+    hasta que el recolector liberase el generador.
+    """
+    try:
+        body.close()
+    except ValueError:
+        # Sigue dentro de next() en el threadpool: no se puede cerrar desde
+        # aquí y queda para el recolector
+        pass
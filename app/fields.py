@@ -0,0 +1,153 @@
+import json
+from datetime import date, datetime
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import select
+from app.models import Entrada, Salida, Stock, Producto, Almacen, Usuario, Rol
+from app.pagination import NEXT_CURSOR_HEADER, paginate
+from app.schemas import EntradaRead, SalidaRead, StockRead, ProductoRead, AlmacenRead, UsuarioRead, RolRead
+
+# Ids por consulta IN al cargar una relación (SQLite limita los parámetros)
+MAX_IN_IDS = 5000
+
+class Resource:
+    """
+    Columnas y relaciones muchos-a-uno de un esquema de lectura. Las columnas
+    son los campos del esquema que no son relaciones, así que nunca se
+    expone nada que el esquema completo no exponga (p. ej. la contraseña).
+    """
+
+    def __init__(self, model, schema, relations: Optional[Dict[str, Tuple[str, "Resource"]]] = None):
+        self.model = model
+        # nombre -> (columna con la clave ajena, recurso relacionado)
+        self.relations = relations or {}
+        self.columns = [name for name in schema.__fields__ if name not in self.relations]
+        self.key = model.__table__.primary_key.columns.values()[0].name
+
+    def column(self, name: str):
+        return getattr(self.model, name)
+
+class Selection:
+    # Columnas de un nivel y relaciones expandidas, cada una con la suya
+    def __init__(self):
+        self.columns: List[str] = []
+        self.expand: Dict[str, "Selection"] = {}
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+def _node(resource: Resource, root: Selection, path: Sequence[str]) -> Tuple[Resource, Selection]:
+    node = root
+    for name in path:
+        if name not in resource.relations:
+            valid = ", ".join(resource.relations) or "ninguna"
+            raise HTTPException(status_code=400, detail=f"Relación desconocida: {name}. Relaciones válidas: {valid}")
+        resource = resource.relations[name][1]
+        node = node.expand.setdefault(name, Selection())
+    return resource, node
+
+def _fill(resource: Resource, node: Selection):
+    # Un nivel sin campos pedidos devuelve todas sus columnas
+    if not node.columns:
+        node.columns = list(resource.columns)
+    for name, child in node.expand.items():
+        _fill(resource.relations[name][1], child)
+
+def parse_selection(resource: Resource, fields: Optional[str], expand: Optional[str]) -> Optional[Selection]:
+    """
+    `expand` lista relaciones (`usuario`, `usuario.rol`); `fields` lista
+    columnas, con prefijo para las de una relación (`producto.nombre`), que
+    queda expandida. None si no se pidió ninguno de los dos: respuesta completa.
+    """
+    if fields is None and expand is None:
+        return None
+    root = Selection()
+    for path in _split(expand):
+        _node(resource, root, path.split("."))
+    for path in _split(fields):
+        *relations, name = path.split(".")
+        target, node = _node(resource, root, relations)
+        if name not in target.columns:
+            raise HTTPException(status_code=400, detail=f"Campo desconocido: {path}. Campos válidos: {', '.join(target.columns)}")
+        if name not in node.columns:
+            node.columns.append(name)
+    _fill(resource, root)
+    return root
+
+class FieldParams:
+    # Parámetros comunes de los listados; sin ninguno, la respuesta no cambia
+    def __init__(
+        self,
+        fields: Optional[str] = Query(None, description="Columnas separadas por comas; `relacion.columna` para las de una relación"),
+        expand: Optional[str] = Query(None, description="Relaciones a incluir, separadas por comas (`usuario.rol` para anidadas)"),
+    ):
+        self.fields = fields
+        self.expand = expand
+
+    def selection(self, resource: Resource) -> Optional[Selection]:
+        return parse_selection(resource, self.fields, self.expand)
+
+def _needed(resource: Resource, selection: Selection) -> List[str]:
+    # Columnas pedidas más la clave y las claves ajenas de las relaciones expandidas
+    names = list(selection.columns)
+    for name in [resource.key] + [resource.relations[r][0] for r in selection.expand]:
+        if name not in names:
+            names.append(name)
+    return names
+
+def select_fields(resource: Resource, selection: Selection):
+    """SELECT solo de las columnas necesarias; admite los mismos .where() que select(model)."""
+    return select(*[resource.column(name) for name in _needed(resource, selection)])
+
+def build_items(session, resource: Resource, selection: Selection, rows: Sequence[Mapping]) -> List[dict]:
+    """
+    Construye los dicts de respuesta sin pasar por los modelos pydantic.
+    Cada relación expandida es una consulta IN por nivel, como selectinload,
+    pero solo con las columnas pedidas.
+    """
+    items = [{name: row[name] for name in selection.columns} for row in rows]
+    for name in resource.relations:
+        child = selection.expand.get(name)
+        if child is None:
+            continue
+        foreign_key, related = resource.relations[name]
+        ids = sorted({row[foreign_key] for row in rows if row[foreign_key] is not None})
+        related_rows = []
+        key = related.column(related.key)
+        for i in range(0, len(ids), MAX_IN_IDS):
+            statement = select_fields(related, child).where(key.in_(ids[i:i + MAX_IN_IDS]))
+            related_rows += [r._mapping for r in session.execute(statement)]
+        built = dict(zip((r[related.key] for r in related_rows), build_items(session, related, child, related_rows)))
+        for item, row in zip(items, rows):
+            item[name] = built.get(row[foreign_key])
+    return items
+
+def paginate_fields(session, resource: Resource, selection: Selection, statement, key, page, response: Response) -> List[dict]:
+    rows = paginate(session, statement, key, page, response)
+    return build_items(session, resource, selection, [row._mapping for row in rows])
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+def fields_response(items: List[dict], source: Optional[Response] = None) -> Response:
+    # JSON directo, sin validar contra response_model: es el camino rápido
+    headers = {}
+    if source is not None and NEXT_CURSOR_HEADER in source.headers:
+        headers[NEXT_CURSOR_HEADER] = source.headers[NEXT_CURSOR_HEADER]
+    body = json.dumps(items, default=_default, separators=(",", ":"), ensure_ascii=False)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Recursos de los listados
+PRODUCTO = Resource(Producto, ProductoRead)
+ROL = Resource(Rol, RolRead)
+USUARIO = Resource(Usuario, UsuarioRead, {"rol": ("id_rol", ROL)})
+ALMACEN = Resource(Almacen, AlmacenRead, {"producto_asignado": ("id_producto", PRODUCTO)})
+STOCK = Resource(Stock, StockRead, {"producto": ("id_producto", PRODUCTO), "almacen": ("id_almacen", ALMACEN)})
+ENTRADA = Resource(Entrada, EntradaRead, {
+    "producto": ("id_producto", PRODUCTO),
+    "almacen": ("id_almacen", ALMACEN),
+    "usuario": ("id_usuario", USUARIO),
+})
+SALIDA = Resource(Salida, SalidaRead, {"producto": ("id_producto", PRODUCTO), "usuario": ("id_usuario", USUARIO)})
@@ -0,0 +1,77 @@
+import codecs
+import csv
+import io
+import os
+from typing import AsyncIterator, Dict, List, Tuple
+
+# Filas por bloque de importación: una consulta IN, un insert en bloque y un
+# commit por bloque. La memoria queda acotada por este valor.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 2000))
+# Errores que se detallan en el informe; el resto solo se cuenta
+MAX_IMPORT_ERRORS = 1000
+
+PRODUCT_COLUMNS = ("barcode", "nombre", "precio")
+
+class CSVInvalido(Exception):
+    pass
+
+def _record_boundary(text: str) -> int:
+    # Posición tras el último salto de línea fuera de comillas: hasta ahí el
+    # texto son registros CSV completos (las comillas escapadas "" no
+    # alteran la paridad)
+    if '"' not in text:
+        return text.rfind("\n") + 1
+    # Al partir por comillas, los tramos pares quedan fuera de comillas
+    cut = offset = 0
+    for i, part in enumerate(text.split('"')):
+        if i % 2 == 0:
+            newline = part.rfind("\n")
+            if newline >= 0:
+                cut = offset + newline + 1
+        offset += len(part) + 1
+    return cut
+
+async def iter_csv_chunks(stream: AsyncIterator[bytes], chunk_size: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[List[Tuple[int, List[str]]]]:
+    """
+    Lee un CSV en streaming y produce bloques de hasta `chunk_size` registros
+    como (número de fila, campos). La fila 1 es la cabecera y también se
+    emite. Solo se retiene en memoria el bloque en curso y un registro
+    incompleto.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+    chunk: List[Tuple[int, List[str]]] = []
+
+    def parse(text):
+        nonlocal line_number
+        for fields in csv.reader(io.StringIO(text)):
+            line_number += 1
+            yield line_number, fields
+
+    async for data in stream:
+        try:
+            pending += decoder.decode(data)
+        except UnicodeDecodeError:
+            raise CSVInvalido("El archivo no está en UTF-8")
+        cut = _record_boundary(pending)
+        if not cut:
+            continue
+        complete, pending = pending[:cut], pending[cut:]
+        for row in parse(complete):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        chunk.extend(parse(pending))
+    if chunk:
+        yield chunk
+
+def header_positions(header: List[str]) -> Dict[str, int]:
+    names = [h.strip().lower() for h in header]
+    missing = [c for c in PRODUCT_COLUMNS if c not in names]
+    if missing:
+        raise CSVInvalido(f"Faltan columnas en la cabecera: {', '.join(missing)}")
+    return {c: names.index(c) for c in PRODUCT_COLUMNS}
@@ -1,11 +1,19 @@
-from fastapi import FastAPI
-from app.database import init_db, get_session, engine
+import time
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.database import get_session, engine, pool_stats
+from app.cache import CACHES
+from app.events import stock_events
+from app.metrics import MetricsMiddleware, metrics_registry
+from app.deps import require_admin
 from app.routers import auth, users, products, warehouses, inventory
 from app.models import Rol, Usuario
-from app.auth import get_password_hash
+from app.startup import prepare_database
+from app.auth import get_password_hash, HashQueueFull, shutdown_hash_pool
 from sqlmodel import Session, select
 
 app = FastAPI(title="Inventrack API", version="1.0.0")
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -13,10 +21,47 @@ app.include_router(products.router)
 app.include_router(warehouses.router)
 app.include_router(inventory.router)
 
+@app.exception_handler(HashQueueFull)
+def hash_queue_full_handler(request: Request, exc: HashQueueFull):
+    # Demasiados hashes bcrypt en cola: se rechaza rápido en lugar de acumular espera
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servicio de autenticación saturado, intente de nuevo"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.get("/cache/stats", dependencies=[Depends(require_admin)], tags=["Sistema"])
+def cache_stats():
+    # Aciertos y tamaño de las cachés en proceso (por worker)
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+@app.get("/db/pool", dependencies=[Depends(require_admin)], tags=["Sistema"])
+def db_pool_stats():
+    # Ocupación del pool y espera de checkout: distingue pool agotado de consultas lentas
+    return pool_stats()
+
+@app.get("/stream/stats", dependencies=[Depends(require_admin)], tags=["Sistema"])
+def stream_stats():
+    # Suscriptores del stream de stock y cambios entregados, agrupados o descartados (por worker)
+    return stock_events.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    # Formato de texto de Prometheus, por worker: sin autenticación para el
+    # scraper, restringir en el proxy
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 def on_startup():
-    init_db()
-    create_initial_data()
+    # Con la base al día es una sola consulta: ni Alembic ni bcrypt
+    started = time.perf_counter()
+    migrated = prepare_database(create_initial_data)
+    metrics_registry.set_gauge("app_startup_seconds", "Duración del evento de arranque del worker.", time.perf_counter() - started)
+    metrics_registry.set_gauge("app_startup_migrated", "1 si este worker migró o sembró la base al arrancar.", int(migrated))
+
+@app.on_event("shutdown")
+def on_shutdown():
+    shutdown_hash_pool()
 
 def create_initial_data():
     with Session(engine) as session:
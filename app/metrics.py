@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Etiqueta de las peticiones que no casan con ninguna ruta (404): usar la
+# ruta real dispararía la cardinalidad
+UNMATCHED_ROUTE = "sin_ruta"
+# Longitud máxima de la sentencia en el log de consultas lentas
+SLOW_QUERY_MAX_CHARS = 1000
+
+class RequestMetrics:
+    """
+    Acumulador de una petición en curso. Los hooks del engine suman aquí sin
+    lock: cada petición tiene el suyo y se vuelca al registro una vez al final.
+    """
+
+    __slots__ = ("scope", "route_paths", "statements", "db_time")
+
+    def __init__(self, scope, route_paths: Dict):
+        self.scope = scope
+        self.route_paths = route_paths
+        self.statements = 0
+        self.db_time = 0.0
+
+    @property
+    def route(self) -> str:
+        # El router deja el endpoint en el scope al resolver la ruta
+        return self.route_paths.get(self.scope.get("endpoint"), UNMATCHED_ROUTE)
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+class _RouteStats:
+    __slots__ = ("buckets", "count", "latency_sum", "statuses", "statements", "db_time", "response_bytes")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.statements = 0
+        self.db_time = 0.0
+        self.response_bytes = 0
+
+class MetricsRegistry:
+    """
+    Métricas por (método, ruta) del worker. Un lock por volcado de petición;
+    los buckets se acumulan solo al exportar.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self.slow_queries = 0
+        # nombre -> (ayuda, valor), para valores sueltos del worker
+        self.gauges: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status: int, latency: float, response_bytes: int, request: RequestMetrics):
+        bucket = bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _RouteStats()
+            stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.latency_sum += latency
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.statements += request.statements
+            stats.db_time += request.db_time
+            stats.response_bytes += response_bytes
+
+    def set_gauge(self, name: str, help_text: str, value: float):
+        with self._lock:
+            self.gauges[name] = (help_text, value)
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def snapshot(self) -> List[Tuple[Tuple[str, str], _RouteStats]]:
+        with self._lock:
+            rows = []
+            for key, stats in sorted(self._routes.items()):
+                copy = _RouteStats()
+                for name in _RouteStats.__slots__:
+                    value = getattr(stats, name)
+                    setattr(copy, name, value.copy() if isinstance(value, (list, dict)) else value)
+                rows.append((key, copy))
+            return rows
+
+    def render(self) -> str:
+        # Formato de texto de Prometheus (versión 0.0.4)
+        rows = self.snapshot()
+        lines: List[str] = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(method, route, **extra):
+            pairs = {"method": method, "route": route, **extra}
+            return ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs.items())
+
+        header("http_requests_total", "counter", "Peticiones HTTP por ruta y código de estado.")
+        for (method, route), s in rows:
+            for status, n in sorted(s.statuses.items()):
+                lines.append(f"http_requests_total{{{labels(method, route, status=status)}}} {n}")
+
+        header("http_request_duration_seconds", "histogram", "Latencia de las peticiones HTTP hasta el último byte de la respuesta.")
+        for (method, route), s in rows:
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, s.buckets):
+                cumulative += n
+                lines.append(f"http_request_duration_seconds_bucket{{{labels(method, route, le=bound)}}} {cumulative}")
+            lines.append(f"http_request_duration_seconds_bucket{{{labels(method, route, le='+Inf')}}} {s.count}")
+            lines.append(f"http_request_duration_seconds_sum{{{labels(method, route)}}} {s.latency_sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels(method, route)}}} {s.count}")
+
+        header("http_response_size_bytes_total", "counter", "Bytes de cuerpo enviados en las respuestas.")
+        for (method, route), s in rows:
+            lines.append(f"http_response_size_bytes_total{{{labels(method, route)}}} {s.response_bytes}")
+
+        header("db_statements_total", "counter", "Sentencias SQL ejecutadas por las peticiones de cada ruta.")
+        for (method, route), s in rows:
+            lines.append(f"db_statements_total{{{labels(method, route)}}} {s.statements}")
+
+        header("db_time_seconds_total", "counter", "Tiempo en la base de datos de las peticiones de cada ruta.")
+        for (method, route), s in rows:
+            lines.append(f"db_time_seconds_total{{{labels(method, route)}}} {s.db_time:.6f}")
+
+        header("db_slow_queries_total", "counter", "Sentencias por encima de SLOW_QUERY_MS.")
+        lines.append(f"db_slow_queries_total {self.slow_queries}")
+
+        for name, (help_text, value) in sorted(self.gauges.items()):
+            header(name, "gauge", help_text)
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metrics_registry = MetricsRegistry()
+
+def _route_paths(app) -> Dict:
+    # endpoint -> plantilla de la ruta ("/products/{product_id}")
+    return {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")}
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro: BaseHTTPMiddleware añade una tarea y una cola por
+    petición. Mide hasta el último chunk del cuerpo, así que las respuestas
+    en streaming cuentan completas.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry):
+        self.app = app
+        self.registry = registry
+        self._paths: Optional[Dict] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self._paths is None:
+            self._paths = _route_paths(scope["app"])
+
+        request = RequestMetrics(scope, self._paths)
+        token = _current.set(request)
+        started = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self.registry.record(scope["method"], request.route, status, time.perf_counter() - started, sent, request)
+
+def instrument_engine(engine, slow_query_ms: float):
+    """
+    Cuenta sentencias y tiempo de base de datos de la petición en curso y
+    registra las que superan `slow_query_ms` (0 desactiva el log).
+    """
+    slow_seconds = slow_query_ms / 1000 if slow_query_ms > 0 else None
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        request = _current.get()
+        if request is not None:
+            request.statements += 1
+            request.db_time += elapsed
+        if slow_seconds is not None and elapsed >= slow_seconds:
+            metrics_registry.record_slow_query()
+            route = f"{request.scope['method']} {request.route}" if request is not None else "-"
+            logger.warning("Consulta lenta (%.1f ms) en %s: %s", elapsed * 1000, route, statement[:SLOW_QUERY_MAX_CHARS])
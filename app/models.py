@@ -1,5 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
+from sqlalchemy import CheckConstraint, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 
 # 1. Roles
@@ -23,7 +24,7 @@ class Usuario(SQLModel, table=True):
     contraseña: str
     nombre: str
     fecha_registro: datetime = Field(default_factory=datetime.utcnow)
-    id_rol: Optional[int] = Field(default=None, foreign_key="roles.id_rol")
+    id_rol: Optional[int] = Field(default=None, foreign_key="roles.id_rol", index=True)
 
     # Relaciones
     rol: Optional[Rol] = Relationship(back_populates="usuarios")
@@ -39,6 +40,8 @@ class Producto(SQLModel, table=True):
     barcode: str = Field(unique=True, index=True)
     nombre: str
     precio: float
+    # Umbral de reorden por defecto del producto (ver AlertaStock)
+    umbral_reorden: Optional[int] = None
 
     # Relaciones
     entradas: List["Entrada"] = Relationship(back_populates="producto")
@@ -58,7 +61,7 @@ class Almacen(SQLModel, table=True):
     id_almacen: Optional[int] = Field(default=None, primary_key=True)
     nombre: str
     # Atributo id_producto según requerimiento (Almacén asociado a un producto específico?)
-    id_producto: Optional[int] = Field(default=None, foreign_key="productos.id_producto")
+    id_producto: Optional[int] = Field(default=None, foreign_key="productos.id_producto", index=True)
 
     # Relaciones
     producto_asignado: Optional[Producto] = Relationship(back_populates="almacenes_asignados")
@@ -71,11 +74,11 @@ class Entrada(SQLModel, table=True):
     __tablename__ = "entradas"
 
     id_entrada: Optional[int] = Field(default=None, primary_key=True)
-    id_usuario: int = Field(foreign_key="usuarios.id_usuario")
-    id_almacen: int = Field(foreign_key="almacenes.id_almacen")
-    id_producto: int = Field(foreign_key="productos.id_producto")
+    id_usuario: int = Field(foreign_key="usuarios.id_usuario", index=True)
+    id_almacen: int = Field(foreign_key="almacenes.id_almacen", index=True)
+    id_producto: int = Field(foreign_key="productos.id_producto", index=True)
     cantidad: int
-    fecha_entrada: datetime = Field(default_factory=datetime.utcnow)
+    fecha_entrada: datetime = Field(default_factory=datetime.utcnow, index=True)
     observaciones: Optional[str] = None
 
     # Relaciones
@@ -89,10 +92,10 @@ class Salida(SQLModel, table=True):
     __tablename__ = "salidas"
 
     id_salida: Optional[int] = Field(default=None, primary_key=True)
-    id_usuario: int = Field(foreign_key="usuarios.id_usuario")
-    id_producto: int = Field(foreign_key="productos.id_producto")
+    id_usuario: int = Field(foreign_key="usuarios.id_usuario", index=True)
+    id_producto: int = Field(foreign_key="productos.id_producto", index=True)
     cantidad: int
-    fecha_salida: datetime = Field(default_factory=datetime.utcnow)
+    fecha_salida: datetime = Field(default_factory=datetime.utcnow, index=True)
     motivo: Optional[str] = None
 
     # Relaciones
@@ -103,12 +106,138 @@ class Salida(SQLModel, table=True):
 # 7. Stock
 class Stock(SQLModel, table=True):
     __tablename__ = "stock"
+    # Una sola fila por (producto, almacén); es la clave del upsert de stock
+    __table_args__ = (
+        UniqueConstraint("id_producto", "id_almacen", name="uq_stock_producto_almacen"),
+        CheckConstraint("cantidad >= 0", name="ck_stock_cantidad_no_negativa"),
+    )
 
     id_stock: Optional[int] = Field(default=None, primary_key=True)
+    # id_producto queda cubierto por el índice único (id_producto, id_almacen)
     id_producto: int = Field(foreign_key="productos.id_producto")
-    id_almacen: int = Field(foreign_key="almacenes.id_almacen")
-    cantidad: int = Field(default=0)
+    id_almacen: int = Field(foreign_key="almacenes.id_almacen", index=True)
+    # Índice para las alertas de stock bajo
+    cantidad: int = Field(default=0, index=True)
+    # Umbral de reorden propio de este almacén; si es None se usa el del producto
+    umbral_reorden: Optional[int] = None
 
     # Relaciones
     producto: Optional[Producto] = Relationship(back_populates="stocks")
     almacen: Optional[Almacen] = Relationship(back_populates="stocks")
+
+
+# 8. Versión del catálogo
+class CatalogVersion(SQLModel, table=True):
+    __tablename__ = "catalog_version"
+    # Fila única que se incrementa con cada escritura de productos o almacenes.
+    # Es la base de los ETag de los listados de catálogo.
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(default=1)
+
+
+# 9. Stock total por producto
+class StockTotal(SQLModel, table=True):
+    __tablename__ = "stock_totales"
+    # Suma de Stock.cantidad de todos los almacenes, mantenida en la misma
+    # transacción que cada entrada y salida (ver app/stock.py).
+    __table_args__ = (CheckConstraint("cantidad >= 0", name="ck_stock_totales_cantidad_no_negativa"),)
+
+    id_producto: int = Field(foreign_key="productos.id_producto", primary_key=True)
+    cantidad: int = Field(default=0)
+
+
+# 10. Alertas de stock bajo
+class AlertaStock(SQLModel, table=True):
+    __tablename__ = "alertas_stock"
+    # Conjunto de (producto, almacén) por debajo de su umbral. Se reevalúa
+    # solo para las filas que cambia cada movimiento (ver app/stock.py).
+
+    id_producto: int = Field(foreign_key="productos.id_producto", primary_key=True)
+    id_almacen: int = Field(foreign_key="almacenes.id_almacen", primary_key=True)
+    cantidad: int
+    umbral: int
+    fecha_actualizacion: datetime = Field(default_factory=datetime.utcnow)
+
+
+# 11. Reparto de cada salida por almacén
+class SalidaAlmacen(SQLModel, table=True):
+    __tablename__ = "salidas_almacenes"
+    # Salida no tiene almacén: aquí queda lo que se descontó de cada uno
+
+    id_salida: int = Field(foreign_key="salidas.id_salida", primary_key=True)
+    id_almacen: int = Field(foreign_key="almacenes.id_almacen", primary_key=True)
+    cantidad: int
+
+
+# 12. Resúmenes de movimientos por hora y por día
+class ResumenMovimientos(SQLModel):
+    # Clave (bucket, producto, almacén): un rango de fechas es un rango de la
+    # clave primaria. Sin claves foráneas: son datos derivados de entradas y
+    # salidas. id_almacen = 0 agrupa salidas antiguas sin reparto por almacén.
+    bucket: datetime = Field(primary_key=True)
+    id_producto: int = Field(primary_key=True)
+    id_almacen: int = Field(primary_key=True)
+    unidades_entrada: int = 0
+    unidades_salida: int = 0
+    entradas: int = 0
+    salidas: int = 0
+
+class MovimientosHora(ResumenMovimientos, table=True):
+    __tablename__ = "movimientos_hora"
+
+class MovimientosDia(ResumenMovimientos, table=True):
+    __tablename__ = "movimientos_dia"
+
+
+# 13. Checkpoints de stock para consultas a fecha pasada
+class StockCheckpoint(SQLModel, table=True):
+    __tablename__ = "stock_checkpoints"
+
+    id_checkpoint: Optional[int] = Field(default=None, primary_key=True)
+    fecha: datetime = Field(index=True)
+    filas: int = 0
+
+class StockCheckpointFila(SQLModel, table=True):
+    __tablename__ = "stock_checkpoint_filas"
+    # Sin claves foráneas a producto/almacén: id_almacen = 0 agrupa salidas
+    # antiguas sin reparto por almacén (ver app/rollups.py)
+
+    id_checkpoint: int = Field(foreign_key="stock_checkpoints.id_checkpoint", primary_key=True)
+    id_producto: int = Field(primary_key=True)
+    id_almacen: int = Field(primary_key=True)
+    cantidad: int
+
+
+# 14. Conciliación de stock contra movimientos
+class SaldoLibro(SQLModel, table=True):
+    __tablename__ = "saldos_libro"
+    # Entradas menos salidas acumuladas por (producto, almacén) hasta la marca
+    # de agua de ReconciliacionEstado
+
+    id_producto: int = Field(primary_key=True)
+    id_almacen: int = Field(primary_key=True)
+    cantidad: int = 0
+
+class ReconciliacionEstado(SQLModel, table=True):
+    __tablename__ = "reconciliacion_estado"
+    # Fila única con la marca de agua: últimos ids de entrada y salida sumados
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    ultima_entrada: int = 0
+    ultima_salida: int = 0
+    fecha_ejecucion: Optional[datetime] = None
+
+
+# 15. Estado del arranque
+class EstadoArranque(SQLModel, table=True):
+    __tablename__ = "estado_arranque"
+    # Fila única con lo que dejó hecho el último arranque: huella de las
+    # migraciones, revisión de Alembic y versión de los datos iniciales. Si
+    # coinciden con el código, el arranque no migra ni siembra (ver app/startup.py)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    huella_esquema: str
+    revision: str
+    version_datos: int
+    fecha: datetime = Field(default_factory=datetime.utcnow)
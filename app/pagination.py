@@ -0,0 +1,26 @@
+from typing import Optional
+from fastapi import Query, Response
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class PageParams:
+    # Paginación por keyset: el cursor es la última clave primaria vista,
+    # así la página N cuesta lo mismo que la primera (sin OFFSET).
+    def __init__(
+        self,
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[int] = Query(None, ge=0),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+def paginate(session, statement, key, page: PageParams, response: Response):
+    if page.cursor is not None:
+        statement = statement.where(key > page.cursor)
+    # Pedimos una fila extra para saber si hay página siguiente
+    rows = session.exec(statement.order_by(key).limit(page.limit + 1)).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(getattr(rows[-1], key.key))
+    return rows
@@ -0,0 +1,79 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Espera por encima de este umbral cuenta como checkout contendido
+CONTENDED_WAIT_SECONDS = 0.005
+
+class PoolStats:
+    """
+    Tiempos de checkout del pool. Un pool saturado se ve como esperas largas
+    y timeouts con utilización cercana a 1; una consulta lenta no.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if wait >= CONTENDED_WAIT_SECONDS:
+                self.contended += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "contended": self.contended,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+POOL_STATS = {"sync": PoolStats(), "async": PoolStats()}
+
+class _TimedCheckout:
+    stats_key = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            POOL_STATS[self.stats_key].record(time.perf_counter() - started, timed_out=True)
+            raise
+        POOL_STATS[self.stats_key].record(time.perf_counter() - started)
+        return conn
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    stats_key = "sync"
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    stats_key = "async"
+
+def pool_status(engine, stats_key: str) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "utilization": round(pool.checkedout() / capacity, 4) if capacity else 0.0,
+        })
+    status.update(POOL_STATS[stats_key].snapshot())
+    return status
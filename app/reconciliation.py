@@ -0,0 +1,267 @@
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import func, literal, tuple_, union_all, update
+from sqlmodel import select
+from app.models import (
+    Entrada, Salida, SalidaAlmacen, Stock, StockTotal, SaldoLibro, ReconciliacionEstado,
+)
+from app.rollups import UNKNOWN_WAREHOUSE
+from app.stock import StockKey, refresh_alerts, upsert_increment
+
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", 5000))
+# Solo se suman movimientos con al menos esta antigüedad: un id menor cuya
+# transacción aún no ha hecho commit no puede quedar detrás de la marca de agua
+RECONCILE_LAG = timedelta(seconds=int(os.getenv("RECONCILE_LAG_SECONDS", 60)))
+# Descuadres que se detallan en el informe; el resto solo se cuenta
+MAX_REPORTED = 1000
+
+def _state(session) -> ReconciliacionEstado:
+    state = session.get(ReconciliacionEstado, 1)
+    if state is None:
+        state = ReconciliacionEstado(id=1)
+        session.add(state)
+        session.flush()
+    return state
+
+def _advance(session, model, key, fecha, batch_size: int, cutoff: datetime, touched: Set[StockKey]) -> int:
+    """
+    Suma al libro los movimientos de `model` posteriores a la marca de agua,
+    por lotes en orden de id. Cada lote es una transacción corta. Se detiene
+    en el primer movimiento más reciente que `cutoff`. Devuelve cuántos procesó.
+    """
+    mark = "ultima_entrada" if model is Entrada else "ultima_salida"
+    processed = 0
+    while True:
+        last = getattr(_state(session), mark)
+        rows = session.exec(select(key, fecha).where(key > last).order_by(key).limit(batch_size)).all()
+        ids = []
+        for movement_id, movement_fecha in rows:
+            if movement_fecha > cutoff:
+                break
+            ids.append(movement_id)
+        if not ids:
+            session.commit()
+            return processed
+
+        deltas: Dict[StockKey, int] = defaultdict(int)
+        if model is Entrada:
+            for p, a, n in session.exec(
+                select(Entrada.id_producto, Entrada.id_almacen, Entrada.cantidad).where(Entrada.id_entrada.in_(ids))
+            ):
+                deltas[(p, a)] += n
+        else:
+            for p, a, n in session.exec(
+                select(Salida.id_producto, func.coalesce(SalidaAlmacen.id_almacen, UNKNOWN_WAREHOUSE), func.coalesce(SalidaAlmacen.cantidad, Salida.cantidad))
+                .outerjoin(SalidaAlmacen, SalidaAlmacen.id_salida == Salida.id_salida)
+                .where(Salida.id_salida.in_(ids))
+            ):
+                deltas[(p, a)] -= n
+
+        upsert_increment(session, SaldoLibro.__table__, ("id_producto", "id_almacen"), [
+            {"id_producto": p, "id_almacen": a, "cantidad": n} for (p, a), n in sorted(deltas.items())
+        ])
+        session.execute(update(ReconciliacionEstado).where(ReconciliacionEstado.id == 1).values({mark: ids[-1]}))
+        session.commit()
+        touched.update(deltas)
+        processed += len(ids)
+        if len(ids) < len(rows) or len(rows) < batch_size:
+            return processed
+
+def _drift(session, keys: List[StockKey]) -> List[dict]:
+    """
+    Compara stock con libro + movimientos aún no sumados para `keys`, en una
+    sola sentencia: ve una foto coherente sin bloquear tablas.
+    """
+    state = _state(session)
+    stock_key = tuple_(Stock.id_producto, Stock.id_almacen)
+    ledger_key = tuple_(SaldoLibro.id_producto, SaldoLibro.id_almacen)
+    entry_key = tuple_(Entrada.id_producto, Entrada.id_almacen)
+    exit_key = tuple_(Salida.id_producto, SalidaAlmacen.id_almacen)
+    parts = union_all(
+        select(Stock.id_producto.label("id_producto"), Stock.id_almacen.label("id_almacen"), Stock.cantidad.label("stock"), literal(0).label("libro"))
+        .where(stock_key.in_(keys)),
+        select(SaldoLibro.id_producto, SaldoLibro.id_almacen, literal(0), SaldoLibro.cantidad)
+        .where(ledger_key.in_(keys)),
+        select(Entrada.id_producto, Entrada.id_almacen, literal(0), Entrada.cantidad)
+        .where(Entrada.id_entrada > state.ultima_entrada, entry_key.in_(keys)),
+        select(Salida.id_producto, SalidaAlmacen.id_almacen, literal(0), -SalidaAlmacen.cantidad)
+        .join(SalidaAlmacen, SalidaAlmacen.id_salida == Salida.id_salida)
+        .where(Salida.id_salida > state.ultima_salida, exit_key.in_(keys)),
+    ).subquery()
+    stock, ledger = func.sum(parts.c.stock), func.sum(parts.c.libro)
+    rows = session.execute(
+        select(parts.c.id_producto, parts.c.id_almacen, stock, ledger)
+        .group_by(parts.c.id_producto, parts.c.id_almacen)
+        .having(stock != ledger)
+    ).all()
+    session.commit()
+    return [{"id_producto": p, "id_almacen": a, "stock": s, "libro": l} for p, a, s, l in rows]
+
+def _all_keys(session, batch_size: int) -> Iterable[List[StockKey]]:
+    # Claves de stock y del libro en lotes por keyset, con lecturas cortas
+    for model in (Stock, SaldoLibro):
+        last = (0, 0)
+        while True:
+            keys = [tuple(k) for k in session.exec(
+                select(model.id_producto, model.id_almacen)
+                .where(tuple_(model.id_producto, model.id_almacen) > last)
+                .order_by(model.id_producto, model.id_almacen)
+                .limit(batch_size)
+            ).all()]
+            session.commit()
+            if not keys:
+                break
+            yield keys
+            last = keys[-1]
+
+def _repair(session, drift: dict) -> bool:
+    # Lleva el stock al valor del libro. El UPDATE va condicionado al valor
+    # leído: si otro movimiento lo cambió entretanto, no se toca. El total
+    # del producto se recalcula después (ver _check_totals).
+    key = (drift["id_producto"], drift["id_almacen"])
+    if drift["libro"] < 0:
+        return False
+    result = session.execute(
+        update(Stock.__table__)
+        .where(Stock.id_producto == key[0], Stock.id_almacen == key[1], Stock.cantidad == drift["stock"])
+        .values(cantidad=drift["libro"])
+    )
+    if result.rowcount != 1:
+        missing = drift["stock"] == 0 and session.exec(
+            select(Stock.id_stock).where(Stock.id_producto == key[0], Stock.id_almacen == key[1])
+        ).first() is None
+        if not missing:
+            session.rollback()
+            return False
+        upsert_increment(session, Stock.__table__, ("id_producto", "id_almacen"), [
+            {"id_producto": key[0], "id_almacen": key[1], "cantidad": drift["libro"]}
+        ])
+    refresh_alerts(session, [key])
+    session.commit()
+    return True
+
+def _product_batches(session, batch_size: int) -> Iterable[List[int]]:
+    last = 0
+    while True:
+        product_ids = session.exec(
+            select(Stock.id_producto).where(Stock.id_producto > last).group_by(Stock.id_producto).order_by(Stock.id_producto).limit(batch_size)
+        ).all()
+        session.commit()
+        if not product_ids:
+            return
+        yield product_ids
+        last = product_ids[-1]
+
+def _check_totals(session, product_ids: List[int], repair: bool) -> List[dict]:
+    # stock_totales contra la suma de stock de cada producto, en una sentencia
+    sums = (
+        select(Stock.id_producto, func.sum(Stock.cantidad).label("suma"))
+        .where(Stock.id_producto.in_(product_ids))
+        .group_by(Stock.id_producto)
+        .subquery()
+    )
+    rows = session.execute(
+        select(sums.c.id_producto, StockTotal.id_producto, func.coalesce(StockTotal.cantidad, 0), sums.c.suma)
+        .outerjoin(StockTotal, StockTotal.id_producto == sums.c.id_producto)
+        .where(func.coalesce(StockTotal.cantidad, 0) != sums.c.suma)
+    ).all()
+    session.commit()
+    mismatched = []
+    for p, has_total, total, suma in rows:
+        fixed = False
+        if repair:
+            if has_total is None:
+                upsert_increment(session, StockTotal.__table__, ("id_producto",), [{"id_producto": p, "cantidad": suma}])
+                fixed = True
+            else:
+                result = session.execute(
+                    update(StockTotal.__table__).where(StockTotal.id_producto == p, StockTotal.cantidad == total).values(cantidad=suma)
+                )
+                fixed = result.rowcount == 1
+            session.commit()
+        mismatched.append({"id_producto": p, "total": total, "suma_almacenes": suma, "reparado": fixed})
+    return mismatched
+
+def reconcile(session, repair: bool = False, full: bool = False, batch_size: int = RECONCILE_BATCH_SIZE, cutoff: Optional[datetime] = None) -> dict:
+    """
+    Suma al libro los movimientos nuevos y compara el stock de los pares que
+    tocaron (o de todos con `full`). Con `repair` lleva el stock de los pares
+    descuadrados al valor del libro y corrige stock_totales. Todo en
+    transacciones cortas por lote.
+    """
+    started = time.perf_counter()
+    cutoff = cutoff or datetime.utcnow() - RECONCILE_LAG
+    touched: Set[StockKey] = set()
+    entries = _advance(session, Entrada, Entrada.id_entrada, Entrada.fecha_entrada, batch_size, cutoff, touched)
+    exits = _advance(session, Salida, Salida.id_salida, Salida.fecha_salida, batch_size, cutoff, touched)
+
+    if full:
+        batches = _all_keys(session, batch_size)
+    else:
+        ordered = sorted(touched)
+        batches = (ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size))
+
+    checked = 0
+    reported: List[dict] = []
+    seen: Set[StockKey] = set()
+    drifted = repaired = 0
+    repaired_products: Set[int] = set()
+    for keys in batches:
+        # Las salidas antiguas sin reparto no se pueden comparar por almacén
+        keys = [k for k in keys if k[1] != UNKNOWN_WAREHOUSE and k not in seen]
+        if not keys:
+            continue
+        seen.update(keys)
+        checked += len(keys)
+        for drift in _drift(session, keys):
+            drift["diferencia"] = drift["stock"] - drift["libro"]
+            drift["reparado"] = _repair(session, drift) if repair else False
+            if drift["reparado"]:
+                repaired_products.add(drift["id_producto"])
+            drifted += 1
+            repaired += drift["reparado"]
+            if len(reported) < MAX_REPORTED:
+                reported.append(drift)
+
+    totals = []
+    if full:
+        for product_ids in _product_batches(session, batch_size):
+            totals += _check_totals(session, product_ids, repair)
+    elif repaired_products:
+        # Los totales de los productos reparados se recalculan desde sus almacenes
+        totals = _check_totals(session, sorted(repaired_products), repair=True)
+    session.execute(update(ReconciliacionEstado).where(ReconciliacionEstado.id == 1).values(fecha_ejecucion=datetime.utcnow()))
+    session.commit()
+    return {
+        "entradas_procesadas": entries,
+        "salidas_procesadas": exits,
+        "pares_revisados": checked,
+        "descuadres": drifted,
+        "reparados": repaired,
+        "detalle": reported,
+        "totales_descuadrados": totals,
+        "duracion_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+def adopt_stock(session):
+    """
+    Toma el stock actual como saldo de apertura del libro y pone la marca de
+    agua en el último movimiento. Para bases con histórico incompleto (stock
+    cargado sin entradas o salidas sin reparto por almacén). Debe ejecutarse
+    con la API parada: marcas y stock tienen que corresponder al mismo instante.
+    """
+    session.execute(SaldoLibro.__table__.delete())
+    state = _state(session)
+    state.ultima_entrada = session.exec(select(func.coalesce(func.max(Entrada.id_entrada), 0))).one()
+    state.ultima_salida = session.exec(select(func.coalesce(func.max(Salida.id_salida), 0))).one()
+    session.add(state)
+    session.execute(
+        SaldoLibro.__table__.insert().from_select(
+            ["id_producto", "id_almacen", "cantidad"],
+            select(Stock.id_producto, Stock.id_almacen, Stock.cantidad),
+        )
+    )
+    session.commit()
@@ -1,22 +1,66 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, Literal, Optional
+from collections import defaultdict
+from datetime import datetime
+import asyncio
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlmodel import Session, select
-from app.database import get_session
-from app.models import Entrada, Salida, Stock, Producto, Almacen
-from app.schemas import EntradaCreate, EntradaRead, SalidaCreate, SalidaRead, StockRead
-from app.deps import get_current_user, require_admin
-import csv
-import io
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import selectinload
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import engine, get_async_session
+from app.models import Entrada, Salida, SalidaAlmacen, Stock, StockTotal, StockCheckpoint, AlertaStock, Producto, Almacen, Usuario
+from app.schemas import EntradaCreate, EntradaRead, EntradaBatchResult, SalidaCreate, SalidaRead, StockRead, StockTotalRead, UmbralUpdate, AlertaRead, ResumenMovimientosRead, StockCheckpointRead
+from app.deps import Principal, get_current_user, get_stream_user, require_admin
+from app.events import SlowConsumer, stock_events
+from app.rollups import GRAINS, GRAIN_STEP, record_entries, record_exit, truncate
+from app.checkpoints import SinCheckpoint, create_checkpoint, stock_as_of
+from app.reconciliation import reconcile
+from app.pagination import PageParams, paginate
+from app.fields import ENTRADA, SALIDA, STOCK, FieldParams, build_items, fields_response, paginate_fields, select_fields
+from app.stock import add_stock, remove_stock, refresh_alerts, rebuild_alerts, StockInsuficiente, StockConflicto
+from app.exports import FORMATS, close_stream, stream_rows, stock_query, entries_query, exits_query
 
 router = APIRouter(prefix="/inventory", tags=["Inventario"])
 
+MAX_BATCH_LINES = 5000
+EXIT_RETRIES = 3
+# Buckets máximos por consulta de resúmenes (~7 meses por hora, ~13 años por día)
+MAX_ROLLUP_BUCKETS = 5000
+# Comentario SSE periódico para que proxies no corten la conexión inactiva
+STREAM_HEARTBEAT_SECONDS = 15
+
+# Relaciones anidadas en los esquemas de lectura. Se cargan con selectin
+# para que un listado cueste un número fijo de consultas y no una por fila.
+STOCK_LOAD = (
+    selectinload(Stock.producto),
+    selectinload(Stock.almacen).selectinload(Almacen.producto_asignado),
+)
+ENTRADA_LOAD = (
+    selectinload(Entrada.producto),
+    selectinload(Entrada.almacen).selectinload(Almacen.producto_asignado),
+    selectinload(Entrada.usuario).selectinload(Usuario.rol),
+)
+SALIDA_LOAD = (
+    selectinload(Salida.producto),
+    selectinload(Salida.usuario).selectinload(Usuario.rol),
+)
+
+async def _reload(session: AsyncSession, model, key, value, options):
+    # Relee un registro con sus relaciones ya cargadas: en async no hay carga perezosa
+    statement = select(model).where(key == value).options(*options).execution_options(populate_existing=True)
+    return (await session.exec(statement)).one()
+
 @router.post("/entry", response_model=EntradaRead)
-def create_entry(entry: EntradaCreate, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+async def create_entry(entry: EntradaCreate, current_user = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
     # Verificar producto y almacén
-    product = session.get(Producto, entry.id_producto)
+    product = await session.get(Producto, entry.id_producto)
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    warehouse = session.get(Almacen, entry.id_almacen)
+    warehouse = await session.get(Almacen, entry.id_almacen)
     if not warehouse:
         raise HTTPException(status_code=404, detail="Almacén no encontrado")
 
@@ -30,22 +74,69 @@ def create_entry(entry: EntradaCreate, current_user = Depends(get_current_user),
     )
     session.add(db_entry)
 
-    # Actualizar Stock
-    stock = session.exec(select(Stock).where(Stock.id_producto == entry.id_producto, Stock.id_almacen == entry.id_almacen)).first()
-    if not stock:
-        stock = Stock(id_producto=entry.id_producto, id_almacen=entry.id_almacen, cantidad=0)
-        session.add(stock)
-    
-    stock.cantidad += entry.cantidad
-    
-    session.commit()
-    session.refresh(db_entry)
-    return db_entry
+    # Actualizar Stock con un upsert atómico (sin leer la fila antes)
+    deltas = {(entry.id_producto, entry.id_almacen): entry.cantidad}
+    await session.run_sync(add_stock, deltas)
+    await session.run_sync(record_entries, db_entry.fecha_entrada, [(entry.id_producto, entry.id_almacen, entry.cantidad)])
+
+    await session.commit()
+    stock_events.publish(deltas)
+    return await _reload(session, Entrada, Entrada.id_entrada, db_entry.id_entrada, ENTRADA_LOAD)
+
+@router.post("/entries/batch", response_model=EntradaBatchResult)
+async def create_entries_batch(entries: List[EntradaCreate], current_user = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    # Recepción de muchas líneas en una sola transacción
+    if not entries:
+        raise HTTPException(status_code=400, detail="El lote está vacío")
+    if len(entries) > MAX_BATCH_LINES:
+        raise HTTPException(status_code=400, detail=f"El lote supera el máximo de {MAX_BATCH_LINES} líneas")
+    started = time.perf_counter()
+
+    # Validar todos los ids con una consulta por tabla
+    product_ids = {e.id_producto for e in entries}
+    found = set((await session.exec(select(Producto.id_producto).where(Producto.id_producto.in_(product_ids)))).all())
+    if product_ids - found:
+        raise HTTPException(status_code=404, detail=f"Productos no encontrados: {sorted(product_ids - found)}")
+    warehouse_ids = {e.id_almacen for e in entries}
+    found = set((await session.exec(select(Almacen.id_almacen).where(Almacen.id_almacen.in_(warehouse_ids)))).all())
+    if warehouse_ids - found:
+        raise HTTPException(status_code=404, detail=f"Almacenes no encontrados: {sorted(warehouse_ids - found)}")
+
+    # Insertar las entradas en bloque
+    now = datetime.utcnow()
+    await session.execute(insert(Entrada.__table__), [
+        {
+            "id_usuario": current_user.id_usuario,
+            "id_almacen": e.id_almacen,
+            "id_producto": e.id_producto,
+            "cantidad": e.cantidad,
+            "fecha_entrada": now,
+            "observaciones": e.observaciones,
+        }
+        for e in entries
+    ])
+
+    # Un solo ajuste de stock por (producto, almacén)
+    deltas = defaultdict(int)
+    for e in entries:
+        deltas[(e.id_producto, e.id_almacen)] += e.cantidad
+    await session.run_sync(add_stock, deltas)
+    await session.run_sync(record_entries, now, [(e.id_producto, e.id_almacen, e.cantidad) for e in entries])
+
+    await session.commit()
+    stock_events.publish(deltas)
+    elapsed = time.perf_counter() - started
+    return EntradaBatchResult(
+        lineas=len(entries),
+        combinaciones_stock=len(deltas),
+        duracion_ms=round(elapsed * 1000, 3),
+        lineas_por_segundo=round(len(entries) / elapsed, 1) if elapsed else 0.0,
+    )
 
 @router.post("/exit", response_model=SalidaRead)
-def create_exit(exit_data: SalidaCreate, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+async def create_exit(exit_data: SalidaCreate, current_user = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
     # Verificar producto
-    product = session.get(Producto, exit_data.id_producto)
+    product = await session.get(Producto, exit_data.id_producto)
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
@@ -58,25 +149,22 @@ def create_exit(exit_data: SalidaCreate, current_user = Depends(get_current_user
     # Esto implica que la salida descuenta del stock global o hay que elegir un almacén arbitrario.
     # Vamos a buscar stock disponible en cualquier almacén y descontar.
     
-    stocks = session.exec(select(Stock).where(Stock.id_producto == exit_data.id_producto, Stock.cantidad > 0)).all()
-    total_stock = sum(s.cantidad for s in stocks)
-    
-    if total_stock < exit_data.cantidad:
-        raise HTTPException(status_code=400, detail="Stock insuficiente")
-
-    remaining_to_deduct = exit_data.cantidad
-    
-    # Descontar de los almacenes disponibles (estrategia simple)
-    for stock in stocks:
-        if remaining_to_deduct <= 0:
+    # Descuento atómico y en orden fijo de almacén; si otra salida concurrente
+    # gana la carrera se reintenta desde una lectura nueva.
+    for _ in range(EXIT_RETRIES):
+        try:
+            deducted = await session.run_sync(remove_stock, exit_data.id_producto, exit_data.cantidad)
             break
-        if stock.cantidad >= remaining_to_deduct:
-            stock.cantidad -= remaining_to_deduct
-            remaining_to_deduct = 0
-        else:
-            remaining_to_deduct -= stock.cantidad
-            stock.cantidad = 0
-        session.add(stock)
+        except StockInsuficiente:
+            await session.rollback()
+            raise HTTPException(status_code=400, detail="Stock insuficiente")
+        except ValueError as e:
+            await session.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        except StockConflicto:
+            await session.rollback()
+    else:
+        raise HTTPException(status_code=409, detail="Conflicto de concurrencia al descontar stock, intente de nuevo")
 
     # Crear registro de salida
     db_exit = Salida(
@@ -86,41 +174,322 @@ def create_exit(exit_data: SalidaCreate, current_user = Depends(get_current_user
         motivo=exit_data.motivo
     )
     session.add(db_exit)
-    session.commit()
-    session.refresh(db_exit)
-    return db_exit
+    await session.flush()
+    # Reparto por almacén: Salida no guarda de qué almacén salió
+    session.add_all([
+        SalidaAlmacen(id_salida=db_exit.id_salida, id_almacen=a, cantidad=taken)
+        for (_, a), taken in sorted(deducted.items())
+    ])
+    await session.run_sync(record_exit, db_exit.fecha_salida, deducted)
+    await session.commit()
+    stock_events.publish({key: -taken for key, taken in deducted.items()})
+    return await _reload(session, Salida, Salida.id_salida, db_exit.id_salida, SALIDA_LOAD)
 
 @router.get("/stock", response_model=List[StockRead])
-def read_stock(current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+async def read_stock(
+    response: Response,
+    id_producto: Optional[int] = None,
+    id_almacen: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    shape: FieldParams = Depends(),
+    current_user = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
     # Admin y Usuario pueden ver stock actual
-    stocks = session.exec(select(Stock)).all()
-    return stocks
+    selection = shape.selection(STOCK)
+    if as_of is not None:
+        return await _read_stock_as_of(session, as_of, id_producto, id_almacen, selection)
+    statement = select(Stock).options(*STOCK_LOAD) if selection is None else select_fields(STOCK, selection)
+    if id_producto is not None:
+        statement = statement.where(Stock.id_producto == id_producto)
+    if id_almacen is not None:
+        statement = statement.where(Stock.id_almacen == id_almacen)
+    if selection is not None:
+        return fields_response(await session.run_sync(paginate_fields, STOCK, selection, statement, Stock.id_stock, page, response), response)
+    return await session.run_sync(paginate, statement, Stock.id_stock, page, response)
+
+async def _read_stock_as_of(session: AsyncSession, as_of: datetime, id_producto: Optional[int], id_almacen: Optional[int], selection=None):
+    # Stock a una fecha pasada: checkpoint más cercano + movimientos hasta
+    # as_of. Sin id_stock y sin paginación: se devuelven todas las filas
+    try:
+        rows = await session.run_sync(stock_as_of, as_of, id_producto, id_almacen)
+    except SinCheckpoint:
+        raise HTTPException(status_code=400, detail="No hay checkpoints de stock; cree uno con POST /inventory/checkpoints")
+    if selection is not None:
+        items = [{"id_stock": None, "id_producto": p, "id_almacen": a, "cantidad": n} for p, a, n in rows]
+        return fields_response(await session.run_sync(build_items, STOCK, selection, items))
+    product_ids = {p for p, _, _ in rows}
+    warehouse_ids = {a for _, a, _ in rows}
+    products = {p.id_producto: p for p in (await session.exec(select(Producto).where(Producto.id_producto.in_(product_ids)))).all()}
+    warehouses = {
+        w.id_almacen: w for w in (await session.exec(
+            select(Almacen).where(Almacen.id_almacen.in_(warehouse_ids)).options(selectinload(Almacen.producto_asignado))
+        )).all()
+    }
+    return [
+        StockRead(id_producto=p, id_almacen=a, cantidad=n, producto=products.get(p), almacen=warehouses.get(a))
+        for p, a, n in rows
+    ]
+
+@router.post("/checkpoints", response_model=StockCheckpointRead, dependencies=[Depends(require_admin)])
+async def create_stock_checkpoint(session: AsyncSession = Depends(get_async_session)):
+    checkpoint = await session.run_sync(create_checkpoint)
+    if checkpoint is None:
+        raise HTTPException(status_code=409, detail="El último checkpoint es demasiado reciente")
+    await session.commit()
+    return checkpoint
+
+@router.get("/checkpoints", response_model=List[StockCheckpointRead], dependencies=[Depends(require_admin)])
+async def read_stock_checkpoints(response: Response, page: PageParams = Depends(), session: AsyncSession = Depends(get_async_session)):
+    return await session.run_sync(paginate, select(StockCheckpoint), StockCheckpoint.id_checkpoint, page, response)
+
+@router.post("/reconcile", dependencies=[Depends(require_admin)])
+def reconcile_stock(reparar: bool = False, completo: bool = False):
+    # Síncrono: recorre los movimientos por lotes, cada uno en su propia
+    # transacción corta, sin bloquear las tablas
+    with Session(engine) as session:
+        return reconcile(session, repair=reparar, full=completo)
+
+@router.websocket("/stream")
+async def stream_stock(websocket: WebSocket, id_producto: Optional[int] = None, id_almacen: Optional[int] = None, token: Optional[str] = None):
+    # Cambios de stock en tiempo real: cada mensaje es una lista de
+    # {id_producto, id_almacen, delta} con los cambios netos desde el anterior
+    try:
+        await get_stream_user(websocket, token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    sub = stock_events.subscribe(id_producto, id_almacen)
+
+    async def pump():
+        while True:
+            await websocket.send_json(await sub.next_batch())
+
+    async def wait_disconnect():
+        # Los mensajes del cliente se ignoran; solo interesa el cierre
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(wait_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if isinstance(task.exception(), SlowConsumer):
+                # 1013: el cliente puede reconectar y releer /inventory/stock
+                await websocket.close(code=1013, reason="Consumidor lento")
+    finally:
+        for task in tasks:
+            task.cancel()
+        stock_events.unsubscribe(sub)
+
+@router.get("/stream/sse")
+async def stream_stock_sse(id_producto: Optional[int] = None, id_almacen: Optional[int] = None, current_user: Principal = Depends(get_stream_user)):
+    # Mismo stream en Server-Sent Events, para clientes sin WebSocket
+    sub = stock_events.subscribe(id_producto, id_almacen)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    batch = await asyncio.wait_for(sub.next_batch(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {json.dumps(batch)}\n\n"
+        except SlowConsumer:
+            yield "event: dropped\ndata: {}\n\n"
+        finally:
+            stock_events.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/stock/summary", response_model=List[StockTotalRead])
+async def read_stock_summary(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    # Total por producto desde stock_totales: una fila por producto, sin sumar almacenes
+    statement = select(StockTotal.id_producto, Producto.barcode, Producto.nombre, StockTotal.cantidad).join(
+        Producto, StockTotal.id_producto == Producto.id_producto
+    )
+    return await session.run_sync(paginate, statement, StockTotal.id_producto, page, response)
 
 @router.get("/movements/entries", response_model=List[EntradaRead], dependencies=[Depends(require_admin)])
-def read_entries(session: Session = Depends(get_session)):
-    return session.exec(select(Entrada)).all()
+async def read_entries(
+    response: Response,
+    id_producto: Optional[int] = None,
+    id_almacen: Optional[int] = None,
+    id_usuario: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    shape: FieldParams = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    selection = shape.selection(ENTRADA)
+    statement = select(Entrada).options(*ENTRADA_LOAD) if selection is None else select_fields(ENTRADA, selection)
+    if id_producto is not None:
+        statement = statement.where(Entrada.id_producto == id_producto)
+    if id_almacen is not None:
+        statement = statement.where(Entrada.id_almacen == id_almacen)
+    if id_usuario is not None:
+        statement = statement.where(Entrada.id_usuario == id_usuario)
+    if desde is not None:
+        statement = statement.where(Entrada.fecha_entrada >= desde)
+    if hasta is not None:
+        statement = statement.where(Entrada.fecha_entrada < hasta)
+    if selection is not None:
+        return fields_response(await session.run_sync(paginate_fields, ENTRADA, selection, statement, Entrada.id_entrada, page, response), response)
+    return await session.run_sync(paginate, statement, Entrada.id_entrada, page, response)
 
 @router.get("/movements/exits", response_model=List[SalidaRead], dependencies=[Depends(require_admin)])
-def read_exits(session: Session = Depends(get_session)):
-    return session.exec(select(Salida)).all()
+async def read_exits(
+    response: Response,
+    id_producto: Optional[int] = None,
+    id_usuario: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    shape: FieldParams = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    selection = shape.selection(SALIDA)
+    statement = select(Salida).options(*SALIDA_LOAD) if selection is None else select_fields(SALIDA, selection)
+    if id_producto is not None:
+        statement = statement.where(Salida.id_producto == id_producto)
+    if id_usuario is not None:
+        statement = statement.where(Salida.id_usuario == id_usuario)
+    if desde is not None:
+        statement = statement.where(Salida.fecha_salida >= desde)
+    if hasta is not None:
+        statement = statement.where(Salida.fecha_salida < hasta)
+    if selection is not None:
+        return fields_response(await session.run_sync(paginate_fields, SALIDA, selection, statement, Salida.id_salida, page, response), response)
+    return await session.run_sync(paginate, statement, Salida.id_salida, page, response)
+
+@router.get("/movements/rollup", response_model=List[ResumenMovimientosRead], dependencies=[Depends(require_admin)])
+async def read_rollup(
+    desde: datetime = Query(..., alias="from"),
+    hasta: datetime = Query(..., alias="to"),
+    grain: Literal["hora", "dia"] = "dia",
+    id_producto: Optional[int] = None,
+    id_almacen: Optional[int] = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    # Unidades y movimientos por bucket, producto y almacén desde las tablas
+    # de resumen: el coste depende de los buckets del rango, no de los movimientos
+    start = truncate(desde, grain)
+    if hasta <= start:
+        raise HTTPException(status_code=400, detail="'to' debe ser posterior a 'from'")
+    if (hasta - start) / GRAIN_STEP[grain] > MAX_ROLLUP_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"El rango supera {MAX_ROLLUP_BUCKETS} buckets de '{grain}'")
+    model = GRAINS[grain]
+    statement = select(model).where(model.bucket >= start, model.bucket < hasta)
+    if id_producto is not None:
+        statement = statement.where(model.id_producto == id_producto)
+    if id_almacen is not None:
+        statement = statement.where(model.id_almacen == id_almacen)
+    statement = statement.order_by(model.bucket, model.id_producto, model.id_almacen)
+    return (await session.exec(statement)).all()
+
+@router.get("/alerts", response_model=List[AlertaRead], dependencies=[Depends(require_admin)])
+async def read_alerts(id_producto: Optional[int] = None, id_almacen: Optional[int] = None, session: AsyncSession = Depends(get_async_session)):
+    # Alertas de stock bajo: se leen del conjunto que mantienen entradas y
+    # salidas (app/stock.py), sin recorrer la tabla de stock
+    statement = select(AlertaStock).order_by(AlertaStock.id_producto, AlertaStock.id_almacen)
+    if id_producto is not None:
+        statement = statement.where(AlertaStock.id_producto == id_producto)
+    if id_almacen is not None:
+        statement = statement.where(AlertaStock.id_almacen == id_almacen)
+    return (await session.exec(statement)).all()
+
+@router.put("/alerts/threshold", response_model=List[AlertaRead], dependencies=[Depends(require_admin)])
+async def set_threshold(data: UmbralUpdate, session: AsyncSession = Depends(get_async_session)):
+    product = await session.get(Producto, data.id_producto)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+    if data.id_almacen is None:
+        # Umbral por defecto del producto: afecta a todos sus almacenes
+        product.umbral_reorden = data.umbral
+        session.add(product)
+        await session.flush()
+        await session.run_sync(rebuild_alerts, data.id_producto)
+    else:
+        warehouse = await session.get(Almacen, data.id_almacen)
+        if not warehouse:
+            raise HTTPException(status_code=404, detail="Almacén no encontrado")
+        key = (data.id_producto, data.id_almacen)
+        # Suma cero para crear la fila de stock si el producto aún no tiene
+        # existencias en ese almacén
+        await session.run_sync(add_stock, {key: 0})
+        await session.execute(
+            update(Stock)
+            .where(Stock.id_producto == data.id_producto, Stock.id_almacen == data.id_almacen)
+            .values(umbral_reorden=data.umbral)
+        )
+        await session.run_sync(refresh_alerts, [key])
+    await session.commit()
 
-@router.get("/alerts", dependencies=[Depends(require_admin)])
-def read_alerts(session: Session = Depends(get_session)):
-    # Alerta de stock bajo (< 10 unidades por ejemplo)
-    low_stock = session.exec(select(Stock).where(Stock.cantidad < 10)).all()
-    return low_stock
+    statement = select(AlertaStock).where(AlertaStock.id_producto == data.id_producto).order_by(AlertaStock.id_almacen)
+    return (await session.exec(statement)).all()
+
+@router.post("/alerts/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_all_alerts(session: AsyncSession = Depends(get_async_session)):
+    # Recalcula todo el conjunto, p. ej. tras cambiar DEFAULT_REORDER_THRESHOLD
+    active = await session.run_sync(rebuild_alerts)
+    await session.commit()
+    return {"alertas": active}
 
 @router.get("/export/csv", dependencies=[Depends(require_admin)])
-def export_inventory(session: Session = Depends(get_session)):
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['ID Stock', 'Producto', 'Almacen', 'Cantidad'])
-    
-    stocks = session.exec(select(Stock)).all()
-    for stock in stocks:
-        p_name = stock.producto.nombre if stock.producto else "Unknown"
-        a_name = stock.almacen.nombre if stock.almacen else "Unknown"
-        writer.writerow([stock.id_stock, p_name, a_name, stock.cantidad])
-        
-    output.seek(0)
-    return Response(content=output.getvalue(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=inventory.csv"})
+def export_inventory():
+    # Formato histórico del export de stock, ahora emitido en streaming
+    statement = (
+        select(
+            Stock.id_stock,
+            func.coalesce(Producto.nombre, "Unknown"),
+            func.coalesce(Almacen.nombre, "Unknown"),
+            Stock.cantidad,
+        )
+        .outerjoin(Producto, Stock.id_producto == Producto.id_producto)
+        .outerjoin(Almacen, Stock.id_almacen == Almacen.id_almacen)
+        .order_by(Stock.id_stock)
+    )
+    body = stream_rows(statement, header=['ID Stock', 'Producto', 'Almacen', 'Cantidad'])
+    return StreamingResponse(
+        body,
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=inventory.csv"},
+        background=BackgroundTask(close_stream, body),
+    )
+
+@router.get("/export/{recurso}", dependencies=[Depends(require_admin)])
+def export_stream(
+    recurso: Literal["stock", "entries", "exits"],
+    formato: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+):
+    if recurso == "stock":
+        statement = stock_query()
+    elif recurso == "entries":
+        statement = entries_query(desde, hasta)
+    else:
+        statement = exits_query(desde, hasta)
+
+    media_type, extension = FORMATS[formato]
+    filename = f"{recurso}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    body = stream_rows(statement, formato, gzip)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        background=BackgroundTask(close_stream, body),
+    )
@@ -1,50 +1,224 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.database import get_session
+import math
+import os
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import Producto
-from app.schemas import ProductoCreate, ProductoRead, ProductoUpdate
+from app.schemas import ProductoCreate, ProductoRead, ProductoUpdate, ProductoImportResult, ImportErrorRow
 from app.deps import get_current_user, require_admin
+from app.pagination import PageParams, paginate
+from app.fields import PRODUCTO, FieldParams, paginate_fields, select_fields
+from app.cache import TTLCache
+from app.catalog import catalog_version, bump_catalog_version, cached_listing, store_listing
+from app.imports import CSVInvalido, MAX_IMPORT_ERRORS, header_positions, iter_csv_chunks
 
 router = APIRouter(prefix="/products", tags=["Productos"])
 
+# barcode -> JSON ya serializado del producto, o NOT_FOUND si no existe.
+# Los fallos también se cachean (con TTL más corto): los escáneres repiten
+# códigos desconocidos tanto como los conocidos.
+barcode_cache = TTLCache(
+    "barcodes",
+    maxsize=int(os.getenv("BARCODE_CACHE_SIZE", 50000)),
+    ttl=float(os.getenv("BARCODE_CACHE_TTL", 300)),
+)
+BARCODE_CACHE_MISS_TTL = float(os.getenv("BARCODE_CACHE_MISS_TTL", 30))
+NOT_FOUND = object()
+_MISSING = object()
+
 @router.post("/", response_model=ProductoRead)
-def create_product(product: ProductoCreate, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+async def create_product(product: ProductoCreate, current_user = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
     # Admin y Usuario pueden crear
-    existing = session.exec(select(Producto).where(Producto.barcode == product.barcode)).first()
+    existing = (await session.exec(select(Producto).where(Producto.barcode == product.barcode))).first()
     if existing:
         raise HTTPException(status_code=400, detail="El código de barras ya existe")
     
     db_product = Producto.from_orm(product)
     session.add(db_product)
-    session.commit()
-    session.refresh(db_product)
+    await session.run_sync(bump_catalog_version)
+    await session.commit()
+    catalog_version.expire()
+    barcode_cache.invalidate(db_product.barcode)
+    await session.refresh(db_product)
     return db_product
 
+async def _read_upload(upload, size: int = 64 * 1024):
+    while True:
+        data = await upload.read(size)
+        if not data:
+            return
+        yield data
+
+@router.post("/import", response_model=ProductoImportResult, dependencies=[Depends(require_admin)])
+async def import_products(request: Request, actualizar: bool = False, session: AsyncSession = Depends(get_async_session)):
+    # Carga masiva de catálogo desde CSV (columnas barcode, nombre, precio).
+    # Acepta el CSV como cuerpo (text/csv) o como campo "file" de un
+    # formulario multipart. Se procesa por bloques: una consulta IN, un
+    # insert en bloque y un commit por bloque. Con actualizar=true los
+    # códigos existentes se actualizan en lugar de reportarse como error.
+    started = time.perf_counter()
+    stream = request.stream()
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Falta el archivo en el campo 'file'")
+        stream = _read_upload(upload)
+
+    table = Producto.__table__
+    positions = None
+    last_row = 0
+    counts = {"filas": 0, "insertados": 0, "actualizados": 0, "errores": 0}
+    errors: List[ImportErrorRow] = []
+
+    def add_error(fila, barcode, error):
+        counts["errores"] += 1
+        if len(errors) < MAX_IMPORT_ERRORS:
+            errors.append(ImportErrorRow(fila=fila, barcode=barcode, error=error))
+
+    try:
+        async for chunk in iter_csv_chunks(stream):
+            # barcode -> (fila, valores); dentro del bloque gana la última fila
+            rows = {}
+            for fila, fields in chunk:
+                last_row = fila
+                if positions is None:
+                    positions = header_positions(fields)
+                    continue
+                if not any(f.strip() for f in fields):
+                    continue
+                counts["filas"] += 1
+                try:
+                    barcode = fields[positions["barcode"]].strip()
+                    nombre = fields[positions["nombre"]].strip()
+                    precio = float(fields[positions["precio"]])
+                except IndexError:
+                    add_error(fila, None, "Faltan columnas")
+                    continue
+                except ValueError:
+                    add_error(fila, barcode, "Precio no numérico")
+                    continue
+                if not barcode or not nombre:
+                    add_error(fila, barcode or None, "barcode y nombre son obligatorios")
+                elif not math.isfinite(precio):
+                    add_error(fila, barcode, "Precio no numérico")
+                elif barcode in rows and not actualizar:
+                    add_error(fila, barcode, "El código de barras ya existe")
+                else:
+                    rows[barcode] = (fila, {"barcode": barcode, "nombre": nombre, "precio": precio})
+            if not rows:
+                continue
+
+            # Códigos ya existentes del bloque en una sola consulta
+            existing = dict((await session.execute(
+                select(Producto.barcode, Producto.id_producto).where(Producto.barcode.in_(list(rows)))
+            )).all())
+            new_rows, updates = [], []
+            for barcode, (fila, values) in rows.items():
+                if barcode not in existing:
+                    new_rows.append(values)
+                elif actualizar:
+                    updates.append({"_id": existing[barcode], "_nombre": values["nombre"], "_precio": values["precio"]})
+                else:
+                    add_error(fila, barcode, "El código de barras ya existe")
+            if not new_rows and not updates:
+                continue
+
+            try:
+                if new_rows:
+                    await session.execute(insert(table), new_rows)
+                if updates:
+                    await session.execute(
+                        update(table)
+                        .where(table.c.id_producto == bindparam("_id"))
+                        .values(nombre=bindparam("_nombre"), precio=bindparam("_precio")),
+                        updates,
+                    )
+                await session.run_sync(bump_catalog_version)
+                await session.commit()
+            except IntegrityError:
+                # Otro proceso insertó alguno de estos códigos entre la consulta y el insert
+                await session.rollback()
+                for barcode, (fila, _) in rows.items():
+                    if barcode not in existing or actualizar:
+                        add_error(fila, barcode, "Conflicto con una escritura concurrente, reintente la fila")
+                continue
+            catalog_version.expire()
+            # Los códigos nuevos pueden estar cacheados como inexistentes
+            for barcode in rows:
+                barcode_cache.invalidate(barcode)
+            counts["insertados"] += len(new_rows)
+            counts["actualizados"] += len(updates)
+    except CSVInvalido as exc:
+        if positions is None:
+            raise HTTPException(status_code=400, detail=str(exc))
+        # Los bloques anteriores ya están confirmados: se informa y se para
+        add_error(last_row + 1, None, str(exc))
+    if positions is None:
+        raise HTTPException(status_code=400, detail="El archivo está vacío")
+
+    elapsed = time.perf_counter() - started
+    return ProductoImportResult(
+        **counts,
+        detalle_errores=sorted(errors, key=lambda e: e.fila),
+        duracion_ms=round(elapsed * 1000, 3),
+        filas_por_segundo=round(counts["filas"] / elapsed, 1) if elapsed else 0.0,
+    )
+
 @router.get("/", response_model=List[ProductoRead])
-def read_products(session: Session = Depends(get_session)):
-    # Acceso anónimo permitido
-    products = session.exec(select(Producto)).all()
-    return products
+async def read_products(request: Request, page: PageParams = Depends(), shape: FieldParams = Depends(), session: AsyncSession = Depends(get_async_session)):
+    # Acceso anónimo permitido. Con ETag: si el catálogo no cambió se
+    # responde 304 o el cuerpo ya serializado sin consultar la base.
+    # fields forma parte de la consulta, así que cada forma tiene su entrada.
+    selection = shape.selection(PRODUCTO)
+    version = catalog_version.cached()
+    if version is None:
+        version = await session.run_sync(catalog_version.load)
+    cached = cached_listing(request, version)
+    if cached is not None:
+        return cached
+    scratch = Response()
+    if selection is not None:
+        items = await session.run_sync(paginate_fields, PRODUCTO, selection, select_fields(PRODUCTO, selection), Producto.id_producto, page, scratch)
+        return store_listing(request, version, items, scratch)
+    products = await session.run_sync(paginate, select(Producto), Producto.id_producto, page, scratch)
+    return store_listing(request, version, [ProductoRead.from_orm(p) for p in products], scratch)
 
 @router.get("/barcode/{barcode}", response_model=ProductoRead)
-def analyze_barcode(barcode: str, session: Session = Depends(get_session)):
+async def analyze_barcode(barcode: str, session: AsyncSession = Depends(get_async_session)):
     # Acceso anónimo permitido
-    product = session.exec(select(Producto).where(Producto.barcode == barcode)).first()
-    if not product:
+    body = barcode_cache.get(barcode, _MISSING)
+    if body is _MISSING:
+        # Token antes de leer: si un update o delete invalida el código
+        # mientras tanto, lo leído no se guarda
+        token = barcode_cache.token()
+        product = (await session.exec(select(Producto).where(Producto.barcode == barcode))).first()
+        if product:
+            body = ProductoRead.from_orm(product).json().encode("utf-8")
+            barcode_cache.set(barcode, body, token=token)
+        else:
+            body = NOT_FOUND
+            barcode_cache.set(barcode, body, ttl=BARCODE_CACHE_MISS_TTL, token=token)
+    if body is NOT_FOUND:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return product
+    return Response(content=body, media_type="application/json")
 
 @router.put("/{product_id}", response_model=ProductoRead)
-def update_product(product_id: int, product_update: ProductoUpdate, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+async def update_product(product_id: int, product_update: ProductoUpdate, current_user = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
     # Admin y Usuario pueden editar
-    db_product = session.get(Producto, product_id)
+    db_product = await session.get(Producto, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
+    old_barcode = db_product.barcode
     
     if product_update.barcode:
         if product_update.barcode != db_product.barcode:
-            existing = session.exec(select(Producto).where(Producto.barcode == product_update.barcode)).first()
+            existing = (await session.exec(select(Producto).where(Producto.barcode == product_update.barcode))).first()
             if existing:
                 raise HTTPException(status_code=400, detail="El código de barras ya existe")
             db_product.barcode = product_update.barcode
@@ -55,17 +229,24 @@ def update_product(product_id: int, product_update: ProductoUpdate, current_user
         db_product.precio = product_update.precio
         
     session.add(db_product)
-    session.commit()
-    session.refresh(db_product)
+    await session.run_sync(bump_catalog_version)
+    await session.commit()
+    catalog_version.expire()
+    barcode_cache.invalidate(old_barcode)
+    barcode_cache.invalidate(db_product.barcode)
+    await session.refresh(db_product)
     return db_product
 
 @router.delete("/{product_id}", dependencies=[Depends(require_admin)])
-def delete_product(product_id: int, session: Session = Depends(get_session)):
+async def delete_product(product_id: int, session: AsyncSession = Depends(get_async_session)):
     # Solo Admin puede eliminar
-    db_product = session.get(Producto, product_id)
+    db_product = await session.get(Producto, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
-    session.delete(db_product)
-    session.commit()
+    await session.delete(db_product)
+    await session.run_sync(bump_catalog_version)
+    await session.commit()
+    catalog_version.expire()
+    barcode_cache.invalidate(db_product.barcode)
     return {"ok": True}
@@ -1,11 +1,14 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
+from sqlalchemy.orm import selectinload
 from app.database import get_session
 from app.models import Usuario, Rol
 from app.schemas import UsuarioCreate, UsuarioRead, UsuarioUpdate
-from app.deps import get_current_user, require_admin
+from app.deps import Principal, get_current_user, require_admin, invalidate_principal
 from app.auth import get_password_hash
+from app.pagination import PageParams, paginate
+from app.fields import USUARIO, FieldParams, fields_response, paginate_fields, select_fields
 
 router = APIRouter(prefix="/users", tags=["Usuarios"])
 
@@ -32,13 +35,21 @@ def create_user(user: UsuarioCreate, session: Session = Depends(get_session)):
     return db_user
 
 @router.get("/", response_model=List[UsuarioRead], dependencies=[Depends(require_admin)])
-def read_users(session: Session = Depends(get_session)):
-    users = session.exec(select(Usuario)).all()
-    return users
+def read_users(response: Response, id_rol: Optional[int] = None, page: PageParams = Depends(), shape: FieldParams = Depends(), session: Session = Depends(get_session)):
+    selection = shape.selection(USUARIO)
+    statement = select(Usuario).options(selectinload(Usuario.rol)) if selection is None else select_fields(USUARIO, selection)
+    if id_rol is not None:
+        statement = statement.where(Usuario.id_rol == id_rol)
+    if selection is not None:
+        return fields_response(paginate_fields(session, USUARIO, selection, statement, Usuario.id_usuario, page, response), response)
+    return paginate(session, statement, Usuario.id_usuario, page, response)
 
 @router.put("/me", response_model=UsuarioRead)
-def update_me(user_update: UsuarioUpdate, current_user: Usuario = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_me(user_update: UsuarioUpdate, principal: Principal = Depends(get_current_user), session: Session = Depends(get_session)):
     # Usuario actualizando sus propios datos
+    current_user = session.get(Usuario, principal.id_usuario)
+    if not current_user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
     if user_update.nombre:
         current_user.nombre = user_update.nombre
     if user_update.email:
@@ -55,6 +66,7 @@ def update_me(user_update: UsuarioUpdate, current_user: Usuario = Depends(get_cu
     
     session.add(current_user)
     session.commit()
+    invalidate_principal(current_user.id_usuario)
     session.refresh(current_user)
     return current_user
 
@@ -82,5 +94,6 @@ def update_user(user_id: int, user_update: UsuarioUpdate, session: Session = Dep
         
     session.add(db_user)
     session.commit()
+    invalidate_principal(db_user.id_usuario)
     session.refresh(db_user)
     return db_user
@@ -1,10 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session, select
+from sqlalchemy.orm import selectinload
 from app.database import get_session
 from app.models import Almacen, Producto
 from app.schemas import AlmacenCreate, AlmacenRead
+from app.catalog import catalog_version, bump_catalog_version, cached_listing, store_listing
 from app.deps import get_current_user, require_admin
+from app.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/warehouses", tags=["Almacenes"])
 
@@ -18,15 +21,24 @@ def create_warehouse(warehouse: AlmacenCreate, session: Session = Depends(get_se
 
     db_warehouse = Almacen.from_orm(warehouse)
     session.add(db_warehouse)
+    bump_catalog_version(session)
     session.commit()
+    catalog_version.expire()
     session.refresh(db_warehouse)
     return db_warehouse
 
 @router.get("/", response_model=List[AlmacenRead])
-def read_warehouses(current_user = Depends(get_current_user), session: Session = Depends(get_session)):
-    # Admin y Usuario pueden ver
-    warehouses = session.exec(select(Almacen)).all()
-    return warehouses
+def read_warehouses(request: Request, page: PageParams = Depends(), current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+    # Admin y Usuario pueden ver. Con ETag, igual que el listado de productos.
+    version = catalog_version.cached()
+    if version is None:
+        version = catalog_version.load(session)
+    cached = cached_listing(request, version)
+    if cached is not None:
+        return cached
+    scratch = Response()
+    warehouses = paginate(session, select(Almacen).options(selectinload(Almacen.producto_asignado)), Almacen.id_almacen, page, scratch)
+    return store_listing(request, version, [AlmacenRead.from_orm(w) for w in warehouses], scratch)
 
 @router.put("/{warehouse_id}", response_model=AlmacenRead, dependencies=[Depends(require_admin)])
 def update_warehouse(warehouse_id: int, warehouse_update: AlmacenCreate, session: Session = Depends(get_session)):
@@ -43,6 +55,8 @@ def update_warehouse(warehouse_id: int, warehouse_update: AlmacenCreate, session
     db_warehouse.id_producto = warehouse_update.id_producto
     
     session.add(db_warehouse)
+    bump_catalog_version(session)
     session.commit()
+    catalog_version.expire()
     session.refresh(db_warehouse)
     return db_warehouse
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlmodel import SQLModel
+from sqlmodel import SQLModel, Field
 from typing import Optional, List
 
 # Token
@@ -71,7 +71,7 @@ class AlmacenRead(AlmacenBase):
 class EntradaCreate(SQLModel):
     id_almacen: int
     id_producto: int
-    cantidad: int
+    cantidad: int = Field(gt=0)
     observaciones: Optional[str] = None
 
 class EntradaRead(SQLModel):
@@ -86,10 +86,16 @@ class EntradaRead(SQLModel):
     almacen: Optional[AlmacenRead] = None
     usuario: Optional[UsuarioRead] = None
 
+class EntradaBatchResult(SQLModel):
+    lineas: int
+    combinaciones_stock: int
+    duracion_ms: float
+    lineas_por_segundo: float
+
 # Salidas
 class SalidaCreate(SQLModel):
     id_producto: int
-    cantidad: int
+    cantidad: int = Field(gt=0)
     motivo: Optional[str] = None
 
 class SalidaRead(SQLModel):
@@ -104,9 +110,62 @@ class SalidaRead(SQLModel):
 
 # Stock
 class StockRead(SQLModel):
-    id_stock: int
+    # None en las consultas con as_of, que no corresponden a una fila de stock
+    id_stock: Optional[int] = None
     id_producto: int
     id_almacen: int
     cantidad: int
     producto: Optional[ProductoRead] = None
     almacen: Optional[AlmacenRead] = None
+
+class StockTotalRead(SQLModel):
+    id_producto: int
+    barcode: str
+    nombre: str
+    cantidad: int
+
+# Alertas de stock bajo
+class UmbralUpdate(SQLModel):
+    id_producto: int
+    # Sin almacén se fija el umbral por defecto del producto
+    id_almacen: Optional[int] = None
+    # None quita el umbral y se vuelve al del producto o al global
+    umbral: Optional[int] = Field(default=None, ge=0)
+
+class AlertaRead(SQLModel):
+    id_producto: int
+    id_almacen: int
+    cantidad: int
+    umbral: int
+    fecha_actualizacion: datetime
+
+# Resúmenes de movimientos
+class ResumenMovimientosRead(SQLModel):
+    bucket: datetime
+    id_producto: int
+    id_almacen: int
+    unidades_entrada: int
+    unidades_salida: int
+    entradas: int
+    salidas: int
+
+# Importación de productos
+class ImportErrorRow(SQLModel):
+    fila: int
+    barcode: Optional[str] = None
+    error: str
+
+class ProductoImportResult(SQLModel):
+    filas: int
+    insertados: int
+    actualizados: int
+    errores: int
+    detalle_errores: List[ImportErrorRow]
+    duracion_ms: float
+    filas_por_segundo: float
+
+# Checkpoints de stock
+class StockCheckpointRead(SQLModel):
+    id_checkpoint: int
+    fecha: datetime
+    filas: int
@@ -0,0 +1,95 @@
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import Callable
+from sqlalchemy import column, exc, table, text
+from sqlmodel import Session, select
+from app.database import BASE_DIR, DATABASE_URL, engine, init_db, is_sqlite, is_sqlite_memory
+from app.models import EstadoArranque
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sin flock, el lock de archivo no se aplica
+    fcntl = None
+
+# Versión de los datos iniciales (roles y administrador). Subirla al cambiar
+# create_initial_data para que el siguiente arranque vuelva a sembrar.
+SEED_VERSION = 1
+# Clave del advisory lock de PostgreSQL que serializa el arranque entre workers
+STARTUP_LOCK_KEY = 74_201_024
+VERSIONS_DIR = BASE_DIR / "migrations" / "versions"
+
+_alembic_version = table("alembic_version", column("version_num"))
+
+def schema_fingerprint() -> str:
+    # Nombres de los scripts de migración: cambia al añadir una sin importar
+    # Alembic ni cargar los scripts
+    names = sorted(name for name in os.listdir(VERSIONS_DIR) if name.endswith(".py"))
+    return hashlib.sha1("\n".join(names).encode()).hexdigest()
+
+def _is_current(fingerprint: str) -> bool:
+    # Una consulta: estado guardado más la revisión que Alembic dejó aplicada
+    # (si alguien migró a mano a otra revisión, no coincide)
+    with Session(engine) as session:
+        try:
+            row = session.exec(
+                select(
+                    EstadoArranque.huella_esquema,
+                    EstadoArranque.revision,
+                    EstadoArranque.version_datos,
+                    select(_alembic_version.c.version_num).scalar_subquery(),
+                ).where(EstadoArranque.id == 1)
+            ).first()
+        except exc.DBAPIError:
+            # Base nueva o anterior a estado_arranque
+            return False
+    return row is not None and row[0] == fingerprint and row[1] == row[3] and row[2] == SEED_VERSION
+
+def _store_state(fingerprint: str):
+    with Session(engine) as session:
+        revision = session.exec(select(_alembic_version.c.version_num)).one()
+        session.merge(EstadoArranque(id=1, huella_esquema=fingerprint, revision=revision, version_datos=SEED_VERSION))
+        session.commit()
+
+@contextmanager
+def startup_lock():
+    """
+    Serializa el trabajo de arranque entre workers: advisory lock de sesión
+    en PostgreSQL y lock de archivo junto a la base en SQLite. Se libera al
+    salir o si el proceso muere.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": STARTUP_LOCK_KEY})
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": STARTUP_LOCK_KEY})
+    elif is_sqlite(DATABASE_URL) and not is_sqlite_memory(DATABASE_URL) and fcntl is not None:
+        with open(f"{engine.url.database}.startup.lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        yield
+
+def prepare_database(seed: Callable[[], None]) -> bool:
+    """
+    Migra y siembra solo si estado_arranque no coincide con el código. La
+    comprobación va primero sin lock, para que los arranques normales no
+    esperen; si hay trabajo se repite con el lock tomado y lo hace un solo
+    worker. Devuelve si migró y sembró.
+    """
+    fingerprint = schema_fingerprint()
+    if _is_current(fingerprint):
+        return False
+    with startup_lock():
+        if _is_current(fingerprint):
+            return False
+        init_db()
+        seed()
+        _store_state(fingerprint)
+    return True
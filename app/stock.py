@@ -0,0 +1,191 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, func, insert, literal, true, update, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from app.models import AlertaStock, Producto, Stock, StockTotal
+
+# Clave de stock: (id_producto, id_almacen)
+StockKey = Tuple[int, int]
+
+class StockInsuficiente(Exception):
+    pass
+
+class StockConflicto(Exception):
+    # Otro movimiento concurrente cambió el stock entre la lectura y el descuento
+    pass
+
+# Umbral de reorden cuando ni el almacén ni el producto definen uno
+DEFAULT_REORDER_THRESHOLD = int(os.getenv("DEFAULT_REORDER_THRESHOLD", 10))
+
+ALERT_KEYS_PER_STATEMENT = 5000
+
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def add_stock(session, deltas: Dict[StockKey, int]):
+    """
+    Suma las cantidades de `deltas` al stock de cada (producto, almacén),
+    creando las filas que falten, y al total materializado de cada producto.
+    No hace commit: corre dentro de la transacción del llamador.
+    """
+    if not deltas:
+        return
+    if any(delta < 0 for delta in deltas.values()):
+        # Restar stock es cosa de remove_stock; aquí acabaría en un IntegrityError
+        raise ValueError("Las cantidades a sumar no pueden ser negativas")
+    # Orden fijo de bloqueo: primero los totales y después las filas de
+    # stock, cada uno por clave ordenada. remove_stock bloquea en el mismo
+    # orden, así que ni dos lotes ni una entrada y una salida concurrentes
+    # del mismo producto pueden producir un deadlock.
+    rows = [
+        {"id_producto": p, "id_almacen": a, "cantidad": delta}
+        for (p, a), delta in sorted(deltas.items())
+    ]
+    totals = defaultdict(int)
+    for (p, _), delta in deltas.items():
+        totals[p] += delta
+
+    upsert_increment(session, StockTotal.__table__, ("id_producto",), [
+        {"id_producto": p, "cantidad": delta} for p, delta in sorted(totals.items())
+    ])
+    upsert_increment(session, Stock.__table__, ("id_producto", "id_almacen"), rows)
+    refresh_alerts(session, deltas.keys())
+
+def upsert_increment(session, table, keys, rows, columns=("cantidad",)):
+    # INSERT ... ON CONFLICT (keys) DO UPDATE SET col = col + excluded.col
+    dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+    if dialect_insert is None:
+        _increment_fallback(session, table, keys, rows, columns)
+        return
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[k] for k in keys],
+        set_={c: table.c[c] + statement.excluded[c] for c in columns},
+    )
+    session.execute(statement, rows)
+
+def _increment_fallback(session, table, keys, rows, columns):
+    # Motores sin upsert: lectura previa de las claves existentes
+    key_columns = [table.c[k] for k in keys]
+    wanted = [tuple(r[k] for k in keys) for r in rows]
+    found = {tuple(row) for row in session.execute(select(*key_columns).where(tuple_(*key_columns).in_(wanted)))}
+
+    updates = [
+        dict({f"_{k}": r[k] for k in keys}, **{f"_delta_{c}": r[c] for c in columns})
+        for r in rows if tuple(r[k] for k in keys) in found
+    ]
+    if updates:
+        session.execute(
+            update(table)
+            .where(*[table.c[k] == bindparam(f"_{k}") for k in keys])
+            .values({c: table.c[c] + bindparam(f"_delta_{c}") for c in columns}),
+            updates,
+        )
+    inserts = [r for r in rows if tuple(r[k] for k in keys) not in found]
+    if inserts:
+        session.execute(insert(table), inserts)
+
+def remove_stock(session, id_producto: int, cantidad: int) -> Dict[StockKey, int]:
+    """
+    Descuenta `cantidad` del stock de un producto recorriendo sus almacenes
+    en orden de id_almacen. Devuelve lo descontado por (producto, almacén).
+    No hace commit; ante StockConflicto el llamador debe hacer rollback.
+    """
+    if cantidad <= 0:
+        # Una cantidad negativa sumaría al total sin tocar ningún almacén
+        raise ValueError(f"La cantidad a descontar debe ser positiva: {cantidad}")
+    table = Stock.__table__
+    totals = StockTotal.__table__
+    # Comprobación de stock suficiente contra el total materializado: una sola
+    # fila por producto en lugar de sumar todos sus almacenes. El UPDATE
+    # condicionado además bloquea esa fila hasta el commit, serializando las
+    # salidas concurrentes del mismo producto. Total antes que filas de
+    # stock: el mismo orden de bloqueo que add_stock.
+    result = session.execute(
+        update(totals)
+        .where(totals.c.id_producto == id_producto, totals.c.cantidad >= cantidad)
+        .values(cantidad=totals.c.cantidad - cantidad)
+    )
+    if result.rowcount != 1:
+        raise StockInsuficiente()
+
+    # FOR UPDATE bloquea las filas del producto en PostgreSQL hasta el commit.
+    # En SQLite se ignora y la protección la da el UPDATE condicionado de abajo.
+    rows: List[tuple] = session.exec(
+        select(Stock.id_stock, Stock.id_almacen, Stock.cantidad)
+        .where(Stock.id_producto == id_producto, Stock.cantidad > 0)
+        .order_by(Stock.id_almacen)
+        .with_for_update()
+    ).all()
+    if sum(r[2] for r in rows) < cantidad:
+        # El total no coincide con los almacenes (ver reconciliación)
+        raise StockInsuficiente()
+
+    deducted = {}
+    remaining = cantidad
+    for id_stock, id_almacen, available in rows:
+        if remaining <= 0:
+            break
+        take = min(available, remaining)
+        # Nunca deja la fila en negativo aunque otra transacción la haya tocado
+        result = session.execute(
+            update(table)
+            .where(table.c.id_stock == id_stock, table.c.cantidad >= take)
+            .values(cantidad=table.c.cantidad - take)
+        )
+        if result.rowcount != 1:
+            raise StockConflicto()
+        deducted[(id_producto, id_almacen)] = take
+        remaining -= take
+    refresh_alerts(session, deducted.keys())
+    return deducted
+
+def _threshold():
+    stock, productos = Stock.__table__, Producto.__table__
+    return func.coalesce(stock.c.umbral_reorden, productos.c.umbral_reorden, DEFAULT_REORDER_THRESHOLD)
+
+def _insert_alerts(session, condition):
+    # INSERT ... SELECT de las filas de stock bajo su umbral que cumplen `condition`
+    stock, productos, alerts = Stock.__table__, Producto.__table__, AlertaStock.__table__
+    threshold = _threshold()
+    below = (
+        select(stock.c.id_producto, stock.c.id_almacen, stock.c.cantidad, threshold, literal(datetime.utcnow()))
+        .join_from(stock, productos, stock.c.id_producto == productos.c.id_producto)
+        .where(condition, stock.c.cantidad < threshold)
+    )
+    return session.execute(
+        insert(alerts).from_select(
+            ["id_producto", "id_almacen", "cantidad", "umbral", "fecha_actualizacion"], below
+        )
+    ).rowcount
+
+def refresh_alerts(session, keys: Iterable[StockKey]):
+    """
+    Reevalúa el conjunto de alertas solo para las claves indicadas: dos
+    sentencias acotadas por el número de filas que cambió el movimiento.
+    """
+    keys = sorted(set(keys))
+    alerts, stock = AlertaStock.__table__, Stock.__table__
+    # Por tramos: cada clave son dos parámetros y SQLite limita su número
+    for i in range(0, len(keys), ALERT_KEYS_PER_STATEMENT):
+        chunk = keys[i:i + ALERT_KEYS_PER_STATEMENT]
+        session.execute(delete(alerts).where(tuple_(alerts.c.id_producto, alerts.c.id_almacen).in_(chunk)))
+        _insert_alerts(session, tuple_(stock.c.id_producto, stock.c.id_almacen).in_(chunk))
+
+def rebuild_alerts(session, id_producto: Optional[int] = None) -> int:
+    """
+    Recalcula las alertas de un producto (tras cambiar su umbral) o de todo
+    el inventario (tras cambiar DEFAULT_REORDER_THRESHOLD). Devuelve cuántas
+    quedan activas en ese ámbito.
+    """
+    alerts, stock = AlertaStock.__table__, Stock.__table__
+    if id_producto is None:
+        session.execute(delete(alerts))
+        return _insert_alerts(session, true())
+    session.execute(delete(alerts).where(alerts.c.id_producto == id_producto))
+    return _insert_alerts(session, stock.c.id_producto == id_producto)
@@ -0,0 +1,241 @@
+import io
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+from sqlalchemy import func, insert, text
+from sqlmodel import select
+from app.auth import get_password_hash
+from app.catalog import bump_catalog_version
+from app.models import Rol, Usuario, Producto, Almacen, Stock, StockTotal, Entrada, Salida, SalidaAlmacen
+from app.reconciliation import adopt_stock
+from app.rollups import backfill_rollups
+from app.stock import StockKey, rebuild_alerts
+
+# Roles de seed.py; los usuarios generados se reparten entre ellos
+ROLES = {
+    "Administrador": "Acceso total al sistema",
+    "Almacenista": "Gestión de inventario y movimientos",
+    "Vendedor": "Consulta de stock y ventas",
+}
+SYNTHETIC_PASSWORD = "123456"
+
+@dataclass
+class SyntheticConfig:
+    productos: int = 10000
+    almacenes: int = 20
+    usuarios: int = 50
+    # Pares (producto, almacén) con movimientos, y por tanto filas de stock
+    pares_stock: int = 50000
+    movimientos: int = 1_000_000
+    anios: float = 3.0
+    # Fracción de productos calientes y de movimientos que se llevan
+    calientes: float = 0.01
+    cuota_calientes: float = 0.8
+    proporcion_entradas: float = 0.4
+    semilla: int = 42
+    hasta: Optional[datetime] = None
+    lote: int = 50000
+    resumenes: bool = True
+
+class BaseNoVacia(Exception):
+    pass
+
+class _BulkWriter:
+    """
+    Inserta filas en bloque con el camino rápido del dialecto: executemany
+    del driver en SQLite y COPY en PostgreSQL. Los valores ya vienen con ids
+    explícitos y fechas como texto ISO.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.dialect = session.get_bind().dialect.name
+
+    def write(self, table, columns: Sequence[str], rows: List[tuple]):
+        if not rows:
+            return
+        names = ", ".join(f'"{c}"' for c in columns)
+        if self.dialect == "sqlite":
+            cursor = self.session.connection().connection.cursor()
+            placeholders = ", ".join("?" for _ in columns)
+            cursor.executemany(f"INSERT INTO {table.name} ({names}) VALUES ({placeholders})", rows)
+            cursor.close()
+        elif self.dialect == "postgresql":
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write("\t".join("\\N" if v is None else str(v) for v in row))
+                buffer.write("\n")
+            buffer.seek(0)
+            cursor = self.session.connection().connection.cursor()
+            cursor.copy_expert(f"COPY {table.name} ({names}) FROM STDIN", buffer)
+            cursor.close()
+        else:
+            self.session.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+    def reset_sequence(self, table, column: str):
+        # Con ids explícitos la secuencia de PostgreSQL no avanza
+        if self.dialect == "postgresql":
+            self.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column}'), "
+                f"COALESCE((SELECT MAX({column}) FROM {table.name}), 0) + 1, false)"
+            ))
+
+@contextmanager
+def _without_indexes(session, tables):
+    # Crear los índices secundarios al final, de una pasada, es mucho más
+    # rápido que mantenerlos fila a fila durante la carga
+    indexes = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        index.drop(session.connection())
+    session.commit()
+    try:
+        yield
+    finally:
+        session.rollback()
+        for index in indexes:
+            index.create(session.connection())
+        session.commit()
+
+def _iso(fecha: datetime) -> str:
+    # Mismo formato que guarda SQLAlchemy en SQLite, para que las
+    # comparaciones de texto y los resúmenes cuadren
+    return fecha.isoformat(" ", "microseconds")
+
+def _roles(session) -> List[int]:
+    ids = []
+    for nombre, descripcion in ROLES.items():
+        rol = session.exec(select(Rol).where(Rol.nombre_rol == nombre)).first()
+        if rol is None:
+            rol = Rol(nombre_rol=nombre, descripcion=descripcion)
+            session.add(rol)
+            session.flush()
+        ids.append(rol.id_rol)
+    return ids
+
+def _pairs(config: SyntheticConfig, rnd: random.Random) -> List[List[int]]:
+    # Almacenes de cada producto: pares_stock repartidos a partes iguales,
+    # al menos uno por producto
+    total = min(max(config.pares_stock, config.productos), config.productos * config.almacenes)
+    per_product, extra = divmod(total, config.productos)
+    warehouses = range(1, config.almacenes + 1)
+    return [
+        sorted(rnd.sample(warehouses, per_product + (1 if p <= extra else 0)))
+        for p in range(1, config.productos + 1)
+    ]
+
+def generate(session, config: SyntheticConfig, progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """
+    Genera un conjunto de datos sintético coherente en una base sin productos
+    ni movimientos: catálogo, usuarios, años de entradas y salidas con sesgo
+    hacia unos pocos productos, stock y totales que cuadran con ellos,
+    alertas, resúmenes y libro de conciliación. Mismo resultado para la
+    misma configuración y semilla. Hace commit por lote.
+    """
+    progress = progress or (lambda message: None)
+    if session.exec(select(func.count()).select_from(Producto)).one() or session.exec(select(func.count()).select_from(Entrada)).one():
+        raise BaseNoVacia("La base ya tiene productos o movimientos")
+    if config.productos < 1 or config.almacenes < 1 or config.usuarios < 1:
+        raise ValueError("Hacen falta al menos un producto, un almacén y un usuario")
+
+    rnd = random.Random(config.semilla)
+    writer = _BulkWriter(session)
+    counts: Dict[str, int] = {}
+    end = config.hasta or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=365 * config.anios)
+
+    progress("Catálogo, almacenes y usuarios...")
+    role_ids = _roles(session)
+    first_user = (session.exec(select(func.max(Usuario.id_usuario))).one() or 0) + 1
+    # Un solo hash bcrypt compartido: hashear por usuario dominaría la carga
+    hashed = get_password_hash(SYNTHETIC_PASSWORD)
+    writer.write(Usuario.__table__, ("id_usuario", "email", "contraseña", "nombre", "fecha_registro", "id_rol"), [
+        (first_user + i, f"usuario{i}@inventrack.test", hashed, f"Usuario {i}", _iso(start), role_ids[i % len(role_ids)])
+        for i in range(config.usuarios)
+    ])
+    user_ids = range(first_user, first_user + config.usuarios)
+    writer.write(Producto.__table__, ("id_producto", "barcode", "nombre", "precio"), [
+        (p, f"SKU{p:09d}", f"Producto {p}", round(rnd.uniform(1, 500), 2)) for p in range(1, config.productos + 1)
+    ])
+    writer.write(Almacen.__table__, ("id_almacen", "nombre"), [(a, f"Almacén {a}") for a in range(1, config.almacenes + 1)])
+    for table, column in ((Usuario.__table__, "id_usuario"), (Producto.__table__, "id_producto"), (Almacen.__table__, "id_almacen")):
+        writer.reset_sequence(table, column)
+    bump_catalog_version(session)
+    session.commit()
+    counts.update(productos=config.productos, almacenes=config.almacenes, usuarios=config.usuarios)
+
+    pairs = _pairs(config, rnd)
+    hot = rnd.sample(range(1, config.productos + 1), max(1, int(config.productos * config.calientes)))
+    step = (end - start) / max(1, config.movimientos)
+
+    stock: Dict[StockKey, int] = {}
+    entries: List[tuple] = []
+    exits: List[tuple] = []
+    splits: List[tuple] = []
+    entry_id = exit_id = 0
+    r = rnd.random
+
+    def flush():
+        writer.write(Entrada.__table__, ("id_entrada", "id_usuario", "id_almacen", "id_producto", "cantidad", "fecha_entrada"), entries)
+        writer.write(Salida.__table__, ("id_salida", "id_usuario", "id_producto", "cantidad", "fecha_salida"), exits)
+        writer.write(SalidaAlmacen.__table__, ("id_salida", "id_almacen", "cantidad"), splits)
+        session.commit()
+        entries.clear()
+        exits.clear()
+        splits.clear()
+
+    progress(f"Movimientos ({config.movimientos})...")
+    with _without_indexes(session, (Entrada.__table__, Salida.__table__, SalidaAlmacen.__table__)):
+        for i in range(config.movimientos):
+            # Un movimiento cada `step` en orden de id, como en producción.
+            # int(r() * n) en lugar de randint: es el bucle caliente
+            fecha = _iso(start + step * i)
+            p = hot[int(r() * len(hot))] if r() < config.cuota_calientes else int(r() * config.productos) + 1
+            warehouses = pairs[p - 1]
+            a = warehouses[int(r() * len(warehouses))]
+            user = user_ids[int(r() * len(user_ids))]
+            available = stock.get((p, a), 0)
+            cantidad = int(r() * 20) + 1
+            if r() < config.proporcion_entradas or available < cantidad:
+                cantidad = int(r() * 91) + 10
+                entry_id += 1
+                entries.append((entry_id, user, a, p, cantidad, fecha))
+                stock[(p, a)] = available + cantidad
+            else:
+                # Cada salida descuenta de un solo almacén
+                exit_id += 1
+                exits.append((exit_id, user, p, cantidad, fecha))
+                splits.append((exit_id, a, cantidad))
+                stock[(p, a)] = available - cantidad
+            if len(entries) + len(exits) >= config.lote:
+                flush()
+                progress(f"  {i + 1} movimientos")
+        flush()
+        progress("Índices de movimientos...")
+    writer.reset_sequence(Entrada.__table__, "id_entrada")
+    writer.reset_sequence(Salida.__table__, "id_salida")
+    counts.update(entradas=entry_id, salidas=exit_id)
+
+    progress("Stock y totales...")
+    keys = sorted(stock)
+    for i in range(0, len(keys), config.lote):
+        writer.write(Stock.__table__, ("id_stock", "id_producto", "id_almacen", "cantidad"), [
+            (i + j + 1, p, a, stock[(p, a)]) for j, (p, a) in enumerate(keys[i:i + config.lote])
+        ])
+    writer.reset_sequence(Stock.__table__, "id_stock")
+    totals: Dict[int, int] = {}
+    for (p, _), cantidad in stock.items():
+        totals[p] = totals.get(p, 0) + cantidad
+    writer.write(StockTotal.__table__, ("id_producto", "cantidad"), sorted(totals.items()))
+    counts.update(stock=len(keys))
+
+    counts["alertas"] = rebuild_alerts(session)
+    session.commit()
+    if config.resumenes:
+        progress("Resúmenes de movimientos...")
+        counts.update({f"resumen_{grain}": rows for grain, rows in backfill_rollups(session).items()})
+        session.commit()
+    # El histórico está completo: el libro parte del stock generado
+    adopt_stock(session)
+    return counts
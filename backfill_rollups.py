@@ -0,0 +1,26 @@
+import argparse
+import sys
+import os
+from datetime import datetime
+
+# Add the current directory to sys.path to make sure we can import app
+sys.path.append(os.getcwd())
+
+from sqlmodel import Session
+from app.database import engine
+from app.rollups import backfill_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula los resúmenes horarios y diarios de movimientos")
+    parser.add_argument("--desde", type=datetime.fromisoformat, help="fecha ISO 8601 (por defecto todo el histórico)")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, help="fecha ISO 8601, exclusiva")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        inserted = backfill_rollups(session, args.desde, args.hasta)
+        session.commit()
+    for grain, rows in inserted.items():
+        print(f"Resumen por {grain}: {rows} filas")
+
+if __name__ == "__main__":
+    main()
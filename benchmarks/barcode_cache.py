@@ -0,0 +1,86 @@
+"""
+Benchmark de la caché de búsqueda por código de barras.
+
+Levanta la app con uvicorn sobre una base SQLite temporal con un catálogo
+sintético y lanza la misma carga de escáner (códigos existentes y algunos
+desconocidos) dos veces: con la caché desactivada y con la caché activa.
+Informa peticiones por segundo y latencias de cada fase.
+
+Uso:
+    python benchmarks/barcode_cache.py --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from common import ADMIN_CREDENTIALS, Server, percentile, use_temp_database
+
+use_temp_database("barcode_cache")
+
+import httpx
+
+async def load(client, barcodes, total, concurrency):
+    latencies = []
+    rnd = random.Random(7)
+    # Sesgo realista: un 20% de códigos concentra la mayoría de lecturas
+    hot = barcodes[: max(1, len(barcodes) // 5)]
+    queue = [rnd.choice(hot) if rnd.random() < 0.8 else rnd.choice(barcodes) for _ in range(total)]
+    queue += [f"DESCONOCIDO-{i % 20}" for i in range(total // 20)]
+
+    async def worker():
+        while queue:
+            code = queue.pop()
+            started = time.perf_counter()
+            r = await client.get(f"/products/barcode/{code}")
+            assert r.status_code in (200, 404)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+async def run(base_url, products, total, concurrency):
+    from app.routers.products import barcode_cache
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        token = (await client.post("/auth/login", data=ADMIN_CREDENTIALS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        barcodes = [f"BC-{i:06d}" for i in range(products)]
+        for code in barcodes:
+            await client.post("/products/", json={"barcode": code, "nombre": code, "precio": 1}, headers=headers)
+
+        results = {}
+        maxsize = barcode_cache.maxsize
+        for phase, size in (("sin caché", 0), ("con caché", maxsize)):
+            barcode_cache.clear()
+            barcode_cache.maxsize = size
+            barcode_cache.hits = barcode_cache.misses = 0
+            results[phase] = await load(client, barcodes, total, concurrency)
+        barcode_cache.maxsize = maxsize
+        results["stats"] = barcode_cache.stats()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    with Server() as server:
+        results = asyncio.run(run(server.url, args.products, args.requests, args.concurrency))
+
+    rps = {}
+    for phase in ("sin caché", "con caché"):
+        latencies, elapsed = results[phase]
+        rps[phase] = len(latencies) / elapsed
+        print(f"{phase}: {len(latencies)} peticiones en {elapsed:.2f}s -> {rps[phase]:.0f} req/s  "
+              f"p50={statistics.median(latencies):.1f}ms  p95={percentile(latencies, 0.95):.1f}ms  "
+              f"p99={percentile(latencies, 0.99):.1f}ms")
+    print(f"aceleración: x{rps['con caché'] / rps['sin caché']:.2f}  caché: {results['stats']}")
+
+if __name__ == "__main__":
+    main()
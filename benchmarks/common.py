@@ -0,0 +1,46 @@
+"""Utilidades compartidas por los scripts de benchmarks/."""
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.getcwd())
+
+ADMIN_CREDENTIALS = {"username": "admin@inventrack.com", "password": "admin123"}
+
+def use_temp_database(name: str):
+    # Sin DATABASE_URL explícita se trabaja sobre una base SQLite desechable
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/{name}.db"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class Server:
+    """Levanta la app real con uvicorn en un hilo, dentro de este proceso."""
+
+    def __init__(self):
+        import uvicorn
+        from app.main import app
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
@@ -0,0 +1,108 @@
+"""
+Compara los planes de ejecución (EXPLAIN) de las consultas calientes antes y
+después de las migraciones de índices.
+
+Crea el esquema en la revisión base (0001, sin índices), carga datos
+sintéticos, captura el plan de cada consulta, aplica `upgrade head` y vuelve
+a capturarlo. Después de la migración ninguna consulta debería recorrer la
+tabla completa (SCAN en SQLite, Seq Scan en PostgreSQL).
+
+Uso:
+    python benchmarks/explain_indexes.py --rows 20000
+    python benchmarks/explain_indexes.py --url postgresql://.../scratch
+
+La base indicada con --url se borra y se vuelve a crear: usar solo una base
+de pruebas. Sin --url se usa una base SQLite temporal.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--url", help="base de datos de pruebas (se borra)")
+parser.add_argument("--rows", type=int, default=20000, help="movimientos sintéticos por tabla")
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = args.url or f"sqlite:///{tempfile.mkdtemp()}/explain.db"
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from app.database import BASE_DIR, engine
+
+SINCE = datetime(2024, 1, 1)
+
+HOT_QUERIES = {
+    "stock por producto y almacén": "SELECT * FROM stock WHERE id_producto = 7 AND id_almacen = 3",
+    "alertas de stock bajo": "SELECT * FROM stock WHERE cantidad < 10",
+    "entradas por rango de fechas": "SELECT * FROM entradas WHERE fecha_entrada >= '2024-03-01' AND fecha_entrada < '2024-03-02'",
+    "salidas por rango de fechas": "SELECT * FROM salidas WHERE fecha_salida >= '2024-03-01' AND fecha_salida < '2024-03-02'",
+    "entradas de un producto": "SELECT * FROM entradas WHERE id_producto = 7 ORDER BY id_entrada LIMIT 100",
+    "salidas de un usuario": "SELECT * FROM salidas WHERE id_usuario = 2 ORDER BY id_salida LIMIT 100",
+}
+
+def alembic_config():
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def load_data(conn, rows):
+    rnd = random.Random(42)
+    conn.execute(text("INSERT INTO roles (id_rol, nombre_rol) VALUES (1, 'Administrador')"))
+    conn.execute(text("INSERT INTO usuarios (id_usuario, email, contraseña, nombre, fecha_registro, id_rol) VALUES (:i, :e, 'x', 'u', :f, 1)"),
+                 [{"i": i, "e": f"u{i}@x", "f": SINCE} for i in range(1, 11)])
+    conn.execute(text("INSERT INTO productos (id_producto, barcode, nombre, precio) VALUES (:i, :b, 'p', 1)"),
+                 [{"i": i, "b": f"B{i}"} for i in range(1, 501)])
+    conn.execute(text("INSERT INTO almacenes (id_almacen, nombre) VALUES (:i, 'a')"), [{"i": i} for i in range(1, 21)])
+    conn.execute(text("INSERT INTO stock (id_producto, id_almacen, cantidad) VALUES (:p, :a, :c)"),
+                 [{"p": p, "a": a, "c": rnd.randint(0, 500)} for p in range(1, 501) for a in range(1, 21)])
+    minutes = 365 * 24 * 60
+    conn.execute(text("INSERT INTO entradas (id_usuario, id_almacen, id_producto, cantidad, fecha_entrada) VALUES (:u, :a, :p, 1, :f)"),
+                 [{"u": rnd.randint(1, 10), "a": rnd.randint(1, 20), "p": rnd.randint(1, 500),
+                   "f": SINCE + timedelta(minutes=rnd.randrange(minutes))} for _ in range(rows)])
+    conn.execute(text("INSERT INTO salidas (id_usuario, id_producto, cantidad, fecha_salida) VALUES (:u, :p, 1, :f)"),
+                 [{"u": rnd.randint(1, 10), "p": rnd.randint(1, 500),
+                   "f": SINCE + timedelta(minutes=rnd.randrange(minutes))} for _ in range(rows)])
+
+def explain(conn, sql):
+    if engine.dialect.name == "sqlite":
+        return [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    return [row[0] for row in conn.execute(text("EXPLAIN " + sql))]
+
+def is_full_scan(plan):
+    return any(line.startswith("SCAN") or "Seq Scan" in line for line in plan)
+
+def capture():
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+        return {name: explain(conn, sql) for name, sql in HOT_QUERIES.items()}
+
+def main():
+    config = alembic_config()
+    command.downgrade(config, "base")
+    command.upgrade(config, "0001")
+    with engine.begin() as conn:
+        load_data(conn, args.rows)
+    before = capture()
+    command.upgrade(config, "head")
+    after = capture()
+
+    regressions = 0
+    for name in HOT_QUERIES:
+        print(f"== {name}")
+        print("   antes:   " + " | ".join(before[name]))
+        print("   después: " + " | ".join(after[name]))
+        if is_full_scan(after[name]):
+            regressions += 1
+            print("   AVISO: sigue recorriendo la tabla completa")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
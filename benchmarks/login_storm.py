@@ -0,0 +1,87 @@
+"""
+Benchmark de ráfaga de logins.
+
+Levanta la app con uvicorn sobre una base SQLite temporal, mide la latencia
+de un endpoint ligero (búsqueda por código de barras) en reposo y mientras
+se lanzan muchos logins concurrentes, e informa el throughput de login.
+
+Con el pool de hash (por defecto) la latencia del resto de endpoints debe
+mantenerse estable durante la ráfaga. Para comparar con bcrypt en línea:
+
+    python benchmarks/login_storm.py
+    HASH_WORKERS=0 python benchmarks/login_storm.py
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from common import ADMIN_CREDENTIALS, Server, percentile, use_temp_database
+
+use_temp_database("login_storm")
+
+import httpx
+
+async def probe(client, url, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+
+async def run(base_url, logins, concurrency, baseline_seconds):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        token = (await client.post("/auth/login", data=ADMIN_CREDENTIALS)).json()["access_token"]
+        await client.post("/products/", json={"barcode": "BENCH-1", "nombre": "Bench", "precio": 1},
+                          headers={"Authorization": f"Bearer {token}"})
+        url = "/products/barcode/BENCH-1"
+
+        stop = asyncio.Event()
+        idle = []
+        task = asyncio.create_task(probe(client, url, stop, idle))
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        await task
+
+        stop = asyncio.Event()
+        storm = []
+        task = asyncio.create_task(probe(client, url, stop, storm))
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = []
+
+        async def login():
+            async with semaphore:
+                r = await client.post("/auth/login", data=ADMIN_CREDENTIALS)
+                statuses.append(r.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await task
+    return idle, storm, statuses, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--baseline-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with Server() as server:
+        idle, storm, statuses, elapsed = asyncio.run(
+            run(server.url, args.logins, args.concurrency, args.baseline_seconds)
+        )
+
+    ok = statuses.count(200)
+    print(f"HASH_WORKERS={os.getenv('HASH_WORKERS', 'por defecto')}")
+    print(f"logins: {len(statuses)}  ok: {ok}  rechazados (503): {statuses.count(503)}  "
+          f"en {elapsed:.2f}s  -> {ok / elapsed:.1f} logins/s")
+    for name, values in (("en reposo", idle), ("durante la ráfaga", storm)):
+        if values:
+            print(f"barcode {name}: n={len(values)}  p50={statistics.median(values):.1f}ms  "
+                  f"p95={percentile(values, 0.95):.1f}ms  p99={percentile(values, 0.99):.1f}ms")
+
+if __name__ == "__main__":
+    main()
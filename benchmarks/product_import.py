@@ -0,0 +1,53 @@
+"""
+Benchmark de la importación de catálogo por CSV.
+
+Genera un CSV sintético en streaming (sin tenerlo entero en memoria) y lo
+sube a POST /products/import contra la app con uvicorn. Una segunda pasada
+con ?actualizar=true mide el camino de actualización. Informa filas por
+segundo y la memoria máxima del proceso.
+
+Uso:
+    python benchmarks/product_import.py --rows 200000
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+from common import ADMIN_CREDENTIALS, Server, use_temp_database
+
+use_temp_database("product_import")
+
+import httpx
+
+async def csv_body(rows, block=5000):
+    yield b"barcode,nombre,precio\n"
+    for start in range(0, rows, block):
+        yield "".join(
+            f'IMP-{i:08d},"Producto {i}, importado",{i % 1000 + 0.99}\n'
+            for i in range(start, min(rows, start + block))
+        ).encode()
+
+async def run(base_url, rows):
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        token = (await client.post("/auth/login", data=ADMIN_CREDENTIALS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+        for label, params in (("inserción", {}), ("actualización", {"actualizar": "true"})):
+            started = time.perf_counter()
+            r = await client.post("/products/import", params=params, content=csv_body(rows), headers=headers)
+            elapsed = time.perf_counter() - started
+            result = r.json()
+            print(f"{label}: {result['filas']} filas en {elapsed:.2f}s -> {result['filas'] / elapsed:.0f} filas/s  "
+                  f"(insertados={result['insertados']} actualizados={result['actualizados']} errores={result['errores']})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with Server() as server:
+        asyncio.run(run(server.url, args.rows))
+    print(f"memoria máxima del proceso: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+if __name__ == "__main__":
+    main()
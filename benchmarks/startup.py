@@ -0,0 +1,73 @@
+"""
+Benchmark de arranque.
+
+Lanza `uvicorn app.main:app --workers N` como proceso aparte y mide el tiempo
+hasta la primera respuesta, con una base nueva (migra y siembra) y con la
+base ya preparada (solo comprueba estado_arranque). Tras cada arranque
+comprueba que los workers no duplicaron roles ni el administrador.
+
+    python benchmarks/startup.py --workers 1 4 --repeticiones 3
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import free_port
+
+import httpx
+
+def time_to_first_request(database_url: str, workers: int, timeout: float = 60) -> float:
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        # Un solo cliente: crear uno por intento cuesta decenas de ms
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get("/metrics").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError("El servidor no respondió a tiempo")
+    finally:
+        process.terminate()
+        process.wait()
+
+def check_seed(path: str):
+    with sqlite3.connect(path) as db:
+        roles = db.execute("SELECT nombre_rol, COUNT(*) FROM roles GROUP BY nombre_rol HAVING COUNT(*) > 1").fetchall()
+        admins = db.execute("SELECT COUNT(*) FROM usuarios WHERE email = 'admin@inventrack.com'").fetchone()[0]
+    if roles or admins != 1:
+        raise RuntimeError(f"Datos iniciales duplicados: roles={roles} administradores={admins}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        cold, warm = [], []
+        for _ in range(args.repeticiones):
+            path = os.path.join(tempfile.mkdtemp(), "startup.db")
+            url = f"sqlite:///{path}"
+            cold.append(time_to_first_request(url, workers))
+            check_seed(path)
+            warm.append(time_to_first_request(url, workers))
+            check_seed(path)
+        print(f"workers={workers}: base nueva {statistics.median(cold) * 1000:7.0f} ms   "
+              f"base preparada {statistics.median(warm) * 1000:7.0f} ms   (mediana de {args.repeticiones})")
+
+if __name__ == "__main__":
+    main()
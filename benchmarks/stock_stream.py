@@ -0,0 +1,159 @@
+"""
+Benchmark del stream de cambios de stock con muchos suscriptores.
+
+Dos fases:
+
+1. Broker en proceso: publica cambios a N suscriptores (un tercio sin filtro,
+   un tercio por almacén y un tercio por producto) y mide el coste de cada
+   publicación. Una parte de los suscriptores no lee nunca, para comprobar
+   que se agrupan y luego se descartan sin crecer.
+
+2. Extremo a extremo: abre N WebSockets reales contra la app con uvicorn,
+   registra entradas por HTTP y mide la latencia desde la petición hasta que
+   cada suscriptor recibe el delta.
+
+Uso:
+    python benchmarks/stock_stream.py --subscribers 1000 --writes 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from common import ADMIN_CREDENTIALS, Server, percentile, use_temp_database
+
+use_temp_database("stock_stream")
+
+import httpx
+from websockets.asyncio.client import connect
+
+from app.events import StockBroker
+
+def _filters(i, products, warehouses):
+    # Reparto de filtros entre los suscriptores
+    kind = i % 3
+    if kind == 0:
+        return None, None
+    if kind == 1:
+        return None, warehouses[i % len(warehouses)]
+    return products[i % len(products)], None
+
+def bench_broker(subscribers, events, slow_ratio, max_pending):
+    async def run():
+        broker = StockBroker()
+        products, warehouses = list(range(1, 21)), list(range(1, 6))
+        subs = [broker.subscribe(*_filters(i, products, warehouses), max_pending=max_pending) for i in range(subscribers)]
+        slow = set(subs[: int(subscribers * slow_ratio)])
+        received = 0
+
+        async def consume(sub):
+            nonlocal received
+            while True:
+                received += len(await sub.next_batch())
+
+        consumers = [asyncio.ensure_future(consume(s)) for s in subs if s not in slow]
+        timings = []
+        for i in range(events):
+            key = (products[i % len(products)], warehouses[(i // len(products)) % len(warehouses)])
+            started = time.perf_counter()
+            broker.publish({key: 1})
+            timings.append((time.perf_counter() - started) * 1e6)
+            # Cede el loop de vez en cuando, como harían las peticiones reales
+            if i % 10 == 0:
+                await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        for c in consumers:
+            c.cancel()
+        return timings, received, broker.stats()
+
+    timings, received, stats = asyncio.run(run())
+    print(f"[broker] {subscribers} suscriptores ({slow_ratio:.0%} sin leer), {events} publicaciones")
+    print(f"  publish: p50={statistics.median(timings):.1f}µs  p99={percentile(timings, 0.99):.1f}µs  max={max(timings):.1f}µs")
+    print(f"  recibidos por los que leen: {received}  stats: {stats}")
+
+async def bench_end_to_end(base_url, subscribers, writes, writers):
+    ws_url = base_url.replace("http://", "ws://")
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        token = (await client.post("/auth/login", data=ADMIN_CREDENTIALS)).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        products = [
+            (await client.post("/products/", json={"barcode": f"STREAM-{i}", "nombre": f"Stream {i}", "precio": 1})).json()["id_producto"]
+            for i in range(20)
+        ]
+        warehouses = [
+            (await client.post("/warehouses/", json={"nombre": f"Stream {i}"})).json()["id_almacen"]
+            for i in range(5)
+        ]
+
+        sent = {}
+        latencies = []
+        expected = 0
+
+        async def subscriber(i, ready):
+            p, a = _filters(i, products, warehouses)
+            query = f"token={token}" + (f"&id_producto={p}" if p else "") + (f"&id_almacen={a}" if a else "")
+            async with connect(f"{ws_url}/inventory/stream?{query}", max_queue=None) as ws:
+                ready.set()
+                async for message in ws:
+                    now = time.perf_counter()
+                    for change in json.loads(message):
+                        # delta == número de escritura + 1; un delta agrupado no casa
+                        if change["delta"] in sent:
+                            latencies.append((now - sent[change["delta"]]) * 1000)
+
+        filters = [_filters(i, products, warehouses) for i in range(subscribers)]
+        tasks = []
+        for start in range(0, subscribers, 100):
+            events = [asyncio.Event() for _ in range(start, min(subscribers, start + 100))]
+            tasks += [asyncio.ensure_future(subscriber(start + j, e)) for j, e in enumerate(events)]
+            await asyncio.gather(*(e.wait() for e in events))
+
+        queue = list(range(writes))
+        write_times = []
+
+        async def writer():
+            nonlocal expected
+            while queue:
+                n = queue.pop(0)
+                p, a = products[n % len(products)], warehouses[(n // len(products)) % len(warehouses)]
+                expected += sum(1 for fp, fa in filters if (fp is None or fp == p) and (fa is None or fa == a))
+                sent[n + 1] = time.perf_counter()
+                r = await client.post("/inventory/entry", json={"id_producto": p, "id_almacen": a, "cantidad": n + 1})
+                assert r.status_code == 200, r.text
+                write_times.append((time.perf_counter() - sent[n + 1]) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(writer() for _ in range(writers)))
+        elapsed = time.perf_counter() - started
+        # Margen para que lleguen los últimos mensajes
+        previous = -1
+        while previous != len(latencies):
+            previous = len(latencies)
+            await asyncio.sleep(0.5)
+        for t in tasks:
+            t.cancel()
+        stats = (await client.get("/stream/stats")).json()
+
+    print(f"[websocket] {subscribers} suscriptores, {writes} entradas con {writers} escritores en {elapsed:.2f}s")
+    print(f"  POST /inventory/entry: p50={statistics.median(write_times):.1f}ms  p99={percentile(write_times, 0.99):.1f}ms")
+    print(f"  entregas: {len(latencies)}/{expected}  latencia p50={statistics.median(latencies):.1f}ms  "
+          f"p95={percentile(latencies, 0.95):.1f}ms  p99={percentile(latencies, 0.99):.1f}ms")
+    print(f"  stats: {stats}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20000, help="publicaciones de la fase de broker")
+    parser.add_argument("--slow", type=float, default=0.1, help="fracción de suscriptores que no leen (fase de broker)")
+    parser.add_argument("--max-pending", type=int, default=50, help="claves pendientes por suscriptor (fase de broker)")
+    parser.add_argument("--writes", type=int, default=200, help="entradas de la fase WebSocket")
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+
+    bench_broker(args.subscribers, args.events, args.slow, args.max_pending)
+    with Server() as server:
+        asyncio.run(bench_end_to_end(server.url, args.subscribers, args.writes, args.writers))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Prueba de estrés de salidas concurrentes sobre un mismo producto.
+
+Lanza muchas salidas en paralelo contra la app real y comprueba que nunca se
+vende más de lo que había: lo vendido + lo que queda == stock inicial y
+ninguna fila de stock queda en negativo.
+
+Uso:
+    python benchmarks/stress_exits.py --exits 200 --workers 32
+
+Sin DATABASE_URL usa una base SQLite temporal.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from common import ADMIN_CREDENTIALS, use_temp_database
+
+use_temp_database("stress")
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from app.main import app
+from app.database import engine
+from app.models import Stock
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exits", type=int, default=200, help="salidas a lanzar")
+    parser.add_argument("--workers", type=int, default=32, help="hilos concurrentes")
+    parser.add_argument("--quantity", type=int, default=3, help="unidades por salida")
+    parser.add_argument("--warehouses", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=100, help="stock inicial por almacén")
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        token = client.post("/auth/login", data=ADMIN_CREDENTIALS).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        product = client.post("/products/", json={"barcode": f"STRESS-{os.getpid()}", "nombre": "Stress", "precio": 1}).json()
+        for i in range(args.warehouses):
+            warehouse = client.post("/warehouses/", json={"nombre": f"Stress {i}"}).json()
+            client.post("/inventory/entry", json={"id_producto": product["id_producto"], "id_almacen": warehouse["id_almacen"], "cantidad": args.stock})
+        initial = args.warehouses * args.stock
+
+        def do_exit(_):
+            return client.post("/inventory/exit", json={"id_producto": product["id_producto"], "cantidad": args.quantity}).status_code
+
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            statuses = list(pool.map(do_exit, range(args.exits)))
+
+    with Session(engine) as session:
+        rows = session.exec(select(Stock.cantidad).where(Stock.id_producto == product["id_producto"])).all()
+
+    ok = statuses.count(200)
+    sold = ok * args.quantity
+    remaining = sum(rows)
+    print(f"salidas: {args.exits}  ok: {ok}  stock insuficiente: {statuses.count(400)}  conflicto: {statuses.count(409)}  otros: {len(statuses) - ok - statuses.count(400) - statuses.count(409)}")
+    print(f"stock inicial: {initial}  vendido: {sold}  restante: {remaining}")
+
+    failures = []
+    if sold + remaining != initial:
+        failures.append("lo vendido más lo restante no coincide con el stock inicial")
+    if any(q < 0 for q in rows):
+        failures.append("hay filas de stock negativas")
+    if sold > initial:
+        failures.append("se vendió más de lo disponible")
+    for failure in failures:
+        print(f"FALLO: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Suite de benchmarks HTTP de los endpoints calientes.
+
+Carga una base SQLite temporal con un volumen configurable, levanta la app
+real con uvicorn y lanza carga concurrente contra cada escenario: búsqueda
+por código de barras, listados de productos y stock, entradas, salidas,
+login y export CSV. Informa throughput y latencias p50/p95/p99 por
+escenario y guarda los resultados en JSON.
+
+Uso:
+    python benchmarks/suite.py run --products 5000 --output resultados.json
+    python benchmarks/suite.py run --baseline base.json --threshold 0.15
+    python benchmarks/suite.py compare base.json resultados.json
+
+`compare` (o `run --baseline`) sale con código 1 si algún escenario pierde
+más de `threshold` de throughput, sube más de `threshold` su p95 o tiene
+más errores que la referencia.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from common import ADMIN_CREDENTIALS, Server, percentile, use_temp_database
+
+# Peticiones de cada escenario como fracción de --requests: login paga
+# bcrypt y el export recorre todo el stock
+SCENARIOS = {
+    "barcode": 1.0,
+    "products": 1.0,
+    "stock": 1.0,
+    "entry": 0.5,
+    "exit": 0.5,
+    "login": 0.05,
+    "export": 0.01,
+}
+TRACKED = ("rps", "p95_ms")
+# SQLite serializa las escrituras: con mucha concurrencia las esperas superan
+# busy_timeout y se mide la cola del lock en vez del endpoint
+WRITE_SCENARIOS = {"entry", "exit"}
+
+def seed(products, warehouses, movements, rnd):
+    # Carga en bloque antes de levantar el servidor
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from app.database import engine, init_db
+    from app.models import Almacen, Entrada, Producto
+    from app.stock import add_stock
+
+    init_db()
+    with Session(engine) as session:
+        session.execute(insert(Producto.__table__), [
+            {"barcode": f"BENCH-{i:08d}", "nombre": f"Producto {i}", "precio": round(rnd.uniform(1, 500), 2)}
+            for i in range(products)
+        ])
+        session.execute(insert(Almacen.__table__), [{"nombre": f"Almacén {i}"} for i in range(warehouses)])
+        session.commit()
+        # Stock abundante en todos los pares para que las salidas no se agoten
+        add_stock(session, {(p, a): 1_000_000 for p in range(1, products + 1) for a in range(1, warehouses + 1)})
+        session.commit()
+        now = datetime.utcnow()
+        session.execute(insert(Entrada.__table__), [
+            {
+                "id_usuario": 1,
+                "id_almacen": rnd.randint(1, warehouses),
+                "id_producto": rnd.randint(1, products),
+                "cantidad": rnd.randint(1, 50),
+                "fecha_entrada": now,
+            }
+            for _ in range(movements)
+        ])
+        session.commit()
+
+def _requests(args, rnd):
+    # Generadores de peticiones por escenario: (método, ruta, kwargs)
+    hot = max(1, args.products // 20)
+
+    def product_id():
+        # Sesgo: un 5% de productos recibe el 80% del tráfico
+        return rnd.randint(1, hot) if rnd.random() < 0.8 else rnd.randint(1, args.products)
+
+    return {
+        "barcode": lambda: ("GET", f"/products/barcode/BENCH-{product_id() - 1:08d}", {}),
+        "products": lambda: ("GET", "/products/", {"params": {"limit": 100, "cursor": rnd.randint(0, max(0, args.products - 100))}}),
+        "stock": lambda: ("GET", "/inventory/stock", {"params": {"limit": 100, "id_producto": product_id()}}),
+        "entry": lambda: ("POST", "/inventory/entry", {"json": {"id_producto": product_id(), "id_almacen": rnd.randint(1, args.warehouses), "cantidad": 1}}),
+        "exit": lambda: ("POST", "/inventory/exit", {"json": {"id_producto": product_id(), "cantidad": 1}}),
+        "login": lambda: ("POST", "/auth/login", {"data": ADMIN_CREDENTIALS}),
+        "export": lambda: ("GET", "/inventory/export/stock", {"params": {"formato": "csv"}}),
+    }
+
+async def run_scenario(client, make_request, total, concurrency):
+    latencies, errors = [], 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = make_request()
+            started = time.perf_counter()
+            r = await client.request(method, path, **kwargs)
+            await r.aread()
+            elapsed = (time.perf_counter() - started) * 1000
+            if r.status_code == 200:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+async def run_all(base_url, args, rnd):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        token = (await client.post("/auth/login", data=ADMIN_CREDENTIALS)).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        makers = _requests(args, rnd)
+        results = {}
+        for name in args.scenarios:
+            total = max(1, int(args.requests * SCENARIOS[name]))
+            concurrency = args.write_concurrency if name in WRITE_SCENARIOS else args.concurrency
+            # Calentamiento: cachés y conexiones del pool
+            await run_scenario(client, makers[name], min(total, concurrency), concurrency)
+            results[name] = await run_scenario(client, makers[name], total, concurrency)
+            r = results[name]
+            print(f"{name:10s} {r['rps']:9.1f} req/s  p50={r['p50_ms']:8.2f}ms  p95={r['p95_ms']:8.2f}ms  "
+                  f"p99={r['p99_ms']:8.2f}ms  errores={r['errors']}")
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current, threshold) -> bool:
+    # True si no hay regresiones
+    ok = True
+    print(f"{'escenario':10s} {'métrica':8s} {'base':>10s} {'actual':>10s} {'cambio':>8s}")
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            continue
+        for metric in TRACKED:
+            before, after = base[metric], now[metric]
+            change = (after - before) / before if before else 0.0
+            # Más rps es mejor; más latencia es peor
+            worse = -change if metric == "rps" else change
+            regressed = worse > threshold
+            ok &= not regressed
+            print(f"{name:10s} {metric:8s} {before:10.2f} {after:10.2f} {change:+8.1%}{'  REGRESIÓN' if regressed else ''}")
+        if now["errors"] > base["errors"]:
+            ok = False
+            print(f"{name:10s} {'errores':8s} {base['errors']:10d} {now['errors']:10d}  REGRESIÓN")
+    return ok
+
+def cmd_run(args):
+    use_temp_database("suite")
+    rnd = random.Random(args.seed)
+    started = time.perf_counter()
+    seed(args.products, args.warehouses, args.movements, rnd)
+    print(f"datos cargados en {time.perf_counter() - started:.1f}s "
+          f"({args.products} productos, {args.warehouses} almacenes, {args.movements} entradas)")
+
+    with Server() as server:
+        results = asyncio.run(run_all(server.url, args, rnd))
+
+    report = {
+        "meta": {
+            "fecha": datetime.utcnow().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "products": args.products,
+            "warehouses": args.warehouses,
+            "movements": args.movements,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "write_concurrency": args.write_concurrency,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"resultados guardados en {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            if not compare(json.load(f), report, args.threshold):
+                sys.exit(1)
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if not compare(baseline, current, args.threshold):
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="carga datos y ejecuta los escenarios")
+    run.add_argument("--products", type=int, default=5000)
+    run.add_argument("--warehouses", type=int, default=10)
+    run.add_argument("--movements", type=int, default=20000, help="entradas históricas")
+    run.add_argument("--requests", type=int, default=2000, help="peticiones base por escenario")
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--write-concurrency", type=int, default=8, help="concurrencia de entradas y salidas")
+    run.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="archivo JSON de resultados")
+    run.add_argument("--baseline", help="JSON de referencia contra el que comparar")
+    run.add_argument("--threshold", type=float, default=0.10)
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="compara dos archivos de resultados")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.10)
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
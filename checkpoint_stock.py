@@ -0,0 +1,23 @@
+import sys
+import os
+
+# Add the current directory to sys.path to make sure we can import app
+sys.path.append(os.getcwd())
+
+from sqlmodel import Session
+from app.database import engine
+from app.checkpoints import create_checkpoint
+
+# Pensado para ejecutarse periódicamente (cron), p. ej. una vez al día: el
+# coste de GET /inventory/stock?as_of= depende del intervalo entre checkpoints.
+def main():
+    with Session(engine) as session:
+        checkpoint = create_checkpoint(session)
+        if checkpoint is None:
+            print("El último checkpoint es demasiado reciente; no se crea otro.")
+            return
+        session.commit()
+        print(f"Checkpoint {checkpoint.id_checkpoint} a {checkpoint.fecha.isoformat()}: {checkpoint.filas} filas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import sys
+import os
+import time
+from datetime import datetime
+
+# Add the current directory to sys.path to make sure we can import app
+sys.path.append(os.getcwd())
+
+from sqlmodel import Session
+from app.database import engine, init_db
+from app.synthetic import BaseNoVacia, SyntheticConfig, generate
+
+def main():
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Genera un conjunto de datos sintético grande y determinista para pruebas de rendimiento")
+    parser.add_argument("--productos", type=int, default=defaults.productos)
+    parser.add_argument("--almacenes", type=int, default=defaults.almacenes)
+    parser.add_argument("--usuarios", type=int, default=defaults.usuarios)
+    parser.add_argument("--pares-stock", type=int, default=defaults.pares_stock, help="pares (producto, almacén) con stock")
+    parser.add_argument("--movimientos", type=int, default=defaults.movimientos, help="entradas más salidas")
+    parser.add_argument("--anios", type=float, default=defaults.anios, help="años de histórico")
+    parser.add_argument("--calientes", type=float, default=defaults.calientes, help="fracción de productos calientes")
+    parser.add_argument("--cuota-calientes", type=float, default=defaults.cuota_calientes, help="fracción de movimientos de los productos calientes")
+    parser.add_argument("--proporcion-entradas", type=float, default=defaults.proporcion_entradas)
+    parser.add_argument("--semilla", type=int, default=defaults.semilla)
+    parser.add_argument("--hasta", type=datetime.fromisoformat, help="fin del histórico (por defecto hoy a las 00:00 UTC)")
+    parser.add_argument("--lote", type=int, default=defaults.lote, help="filas por commit")
+    parser.add_argument("--sin-resumenes", action="store_true", help="no calcular movimientos_hora/movimientos_dia")
+    args = parser.parse_args()
+
+    config = SyntheticConfig(
+        productos=args.productos,
+        almacenes=args.almacenes,
+        usuarios=args.usuarios,
+        pares_stock=args.pares_stock,
+        movimientos=args.movimientos,
+        anios=args.anios,
+        calientes=args.calientes,
+        cuota_calientes=args.cuota_calientes,
+        proporcion_entradas=args.proporcion_entradas,
+        semilla=args.semilla,
+        hasta=args.hasta,
+        lote=args.lote,
+        resumenes=not args.sin_resumenes,
+    )
+    started = time.perf_counter()
+    init_db()
+    with Session(engine) as session:
+        try:
+            counts = generate(session, config, progress=lambda message: print(f"[{time.perf_counter() - started:7.1f}s] {message}"))
+        except BaseNoVacia as exc:
+            print(f"{exc}: el generador necesita una base sin catálogo ni movimientos.")
+            sys.exit(1)
+    for name, value in counts.items():
+        print(f"{name}: {value}")
+    print(f"Completado en {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
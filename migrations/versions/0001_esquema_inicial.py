@@ -0,0 +1,99 @@
+"""esquema inicial
+
+Tablas tal como las creaba SQLModel.metadata.create_all antes de usar
+migraciones. Las tablas que ya existen se respetan, así una base creada con
+create_all puede pasar a Alembic con un simple `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if context.is_offline_mode():
+        existing = set()
+    else:
+        existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "productos" not in existing:
+        op.create_table(
+            "productos",
+            sa.Column("id_producto", sa.Integer(), primary_key=True),
+            sa.Column("barcode", sa.String(), nullable=False),
+            sa.Column("nombre", sa.String(), nullable=False),
+            sa.Column("precio", sa.Float(), nullable=False),
+        )
+        op.create_index("ix_productos_barcode", "productos", ["barcode"], unique=True)
+
+    if "roles" not in existing:
+        op.create_table(
+            "roles",
+            sa.Column("id_rol", sa.Integer(), primary_key=True),
+            sa.Column("nombre_rol", sa.String(), nullable=False),
+            sa.Column("descripcion", sa.String(), nullable=True),
+        )
+
+    if "almacenes" not in existing:
+        op.create_table(
+            "almacenes",
+            sa.Column("id_almacen", sa.Integer(), primary_key=True),
+            sa.Column("nombre", sa.String(), nullable=False),
+            sa.Column("id_producto", sa.Integer(), sa.ForeignKey("productos.id_producto"), nullable=True),
+        )
+
+    if "usuarios" not in existing:
+        op.create_table(
+            "usuarios",
+            sa.Column("id_usuario", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("contraseña", sa.String(), nullable=False),
+            sa.Column("nombre", sa.String(), nullable=False),
+            sa.Column("fecha_registro", sa.DateTime(), nullable=False),
+            sa.Column("id_rol", sa.Integer(), sa.ForeignKey("roles.id_rol"), nullable=True),
+        )
+        op.create_index("ix_usuarios_email", "usuarios", ["email"], unique=True)
+
+    if "entradas" not in existing:
+        op.create_table(
+            "entradas",
+            sa.Column("id_entrada", sa.Integer(), primary_key=True),
+            sa.Column("id_usuario", sa.Integer(), sa.ForeignKey("usuarios.id_usuario"), nullable=False),
+            sa.Column("id_almacen", sa.Integer(), sa.ForeignKey("almacenes.id_almacen"), nullable=False),
+            sa.Column("id_producto", sa.Integer(), sa.ForeignKey("productos.id_producto"), nullable=False),
+            sa.Column("cantidad", sa.Integer(), nullable=False),
+            sa.Column("fecha_entrada", sa.DateTime(), nullable=False),
+            sa.Column("observaciones", sa.String(), nullable=True),
+        )
+
+    if "salidas" not in existing:
+        op.create_table(
+            "salidas",
+            sa.Column("id_salida", sa.Integer(), primary_key=True),
+            sa.Column("id_usuario", sa.Integer(), sa.ForeignKey("usuarios.id_usuario"), nullable=False),
+            sa.Column("id_producto", sa.Integer(), sa.ForeignKey("productos.id_producto"), nullable=False),
+            sa.Column("cantidad", sa.Integer(), nullable=False),
+            sa.Column("fecha_salida", sa.DateTime(), nullable=False),
+            sa.Column("motivo", sa.String(), nullable=True),
+        )
+
+    if "stock" not in existing:
+        op.create_table(
+            "stock",
+            sa.Column("id_stock", sa.Integer(), primary_key=True),
+            sa.Column("id_producto", sa.Integer(), sa.ForeignKey("productos.id_producto"), nullable=False),
+            sa.Column("id_almacen", sa.Integer(), sa.ForeignKey("almacenes.id_almacen"), nullable=False),
+            sa.Column("cantidad", sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    for table in ("stock", "salidas", "entradas", "usuarios", "almacenes", "roles", "productos"):
+        op.drop_table(table)
@@ -0,0 +1,69 @@
+"""índices de rendimiento y clave única de stock
+
+- stock(id_producto, id_almacen) único: clave del upsert de stock. Antes de
+  crearlo se fusionan las filas duplicadas sumando sus cantidades.
+- stock(cantidad) no negativo, e índice para las alertas de stock bajo.
+- entradas(fecha_entrada) y salidas(fecha_salida) para filtros por fecha.
+- Índices sobre las claves foráneas de los movimientos.
+
+Si hay filas de stock negativas la migración falla al crear el CHECK; hay
+que corregirlas antes de volver a ejecutarla.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_stock_id_almacen", "stock", ["id_almacen"]),
+    ("ix_stock_cantidad", "stock", ["cantidad"]),
+    ("ix_entradas_fecha_entrada", "entradas", ["fecha_entrada"]),
+    ("ix_entradas_id_producto", "entradas", ["id_producto"]),
+    ("ix_entradas_id_almacen", "entradas", ["id_almacen"]),
+    ("ix_entradas_id_usuario", "entradas", ["id_usuario"]),
+    ("ix_salidas_fecha_salida", "salidas", ["fecha_salida"]),
+    ("ix_salidas_id_producto", "salidas", ["id_producto"]),
+    ("ix_salidas_id_usuario", "salidas", ["id_usuario"]),
+    ("ix_almacenes_id_producto", "almacenes", ["id_producto"]),
+    ("ix_usuarios_id_rol", "usuarios", ["id_rol"]),
+]
+
+
+def upgrade():
+    # Fusionar duplicados (producto, almacén) en la fila de menor id
+    op.execute("""
+        UPDATE stock SET cantidad = (
+            SELECT SUM(s2.cantidad) FROM stock s2
+            WHERE s2.id_producto = stock.id_producto AND s2.id_almacen = stock.id_almacen
+        )
+        WHERE id_stock IN (
+            SELECT MIN(id_stock) FROM stock GROUP BY id_producto, id_almacen HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM stock WHERE id_stock NOT IN (
+            SELECT MIN(id_stock) FROM stock GROUP BY id_producto, id_almacen
+        )
+    """)
+
+    with op.batch_alter_table("stock") as batch:
+        batch.create_unique_constraint("uq_stock_producto_almacen", ["id_producto", "id_almacen"])
+        batch.create_check_constraint("ck_stock_cantidad_no_negativa", "cantidad >= 0")
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table("stock") as batch:
+        batch.drop_constraint("ck_stock_cantidad_no_negativa", type_="check")
+        batch.drop_constraint("uq_stock_producto_almacen", type_="unique")
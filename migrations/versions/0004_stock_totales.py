@@ -0,0 +1,30 @@
+"""stock total materializado por producto
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stock_totales",
+        sa.Column("id_producto", sa.Integer(), sa.ForeignKey("productos.id_producto"), primary_key=True),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.CheckConstraint("cantidad >= 0", name="ck_stock_totales_cantidad_no_negativa"),
+    )
+    op.execute("""
+        INSERT INTO stock_totales (id_producto, cantidad)
+        SELECT id_producto, SUM(cantidad) FROM stock GROUP BY id_producto
+    """)
+
+
+def downgrade():
+    op.drop_table("stock_totales")
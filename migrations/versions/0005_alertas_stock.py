@@ -0,0 +1,44 @@
+"""umbrales de reorden y conjunto de alertas de stock
+
+El conjunto inicial se calcula con el umbral por defecto de 10 unidades, el
+mismo que usaba GET /inventory/alerts.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("productos") as batch:
+        batch.add_column(sa.Column("umbral_reorden", sa.Integer(), nullable=True))
+    with op.batch_alter_table("stock") as batch:
+        batch.add_column(sa.Column("umbral_reorden", sa.Integer(), nullable=True))
+
+    op.create_table(
+        "alertas_stock",
+        sa.Column("id_producto", sa.Integer(), sa.ForeignKey("productos.id_producto"), primary_key=True),
+        sa.Column("id_almacen", sa.Integer(), sa.ForeignKey("almacenes.id_almacen"), primary_key=True),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("umbral", sa.Integer(), nullable=False),
+        sa.Column("fecha_actualizacion", sa.DateTime(), nullable=False),
+    )
+    op.execute("""
+        INSERT INTO alertas_stock (id_producto, id_almacen, cantidad, umbral, fecha_actualizacion)
+        SELECT id_producto, id_almacen, cantidad, 10, CURRENT_TIMESTAMP FROM stock WHERE cantidad < 10
+    """)
+
+
+def downgrade():
+    op.drop_table("alertas_stock")
+    with op.batch_alter_table("stock") as batch:
+        batch.drop_column("umbral_reorden")
+    with op.batch_alter_table("productos") as batch:
+        batch.drop_column("umbral_reorden")
@@ -0,0 +1,44 @@
+"""reparto de salidas por almacén y resúmenes de movimientos
+
+Las tablas de resumen se crean vacías; el histórico se carga con
+`python backfill_rollups.py`.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = ("movimientos_hora", "movimientos_dia")
+
+
+def upgrade():
+    op.create_table(
+        "salidas_almacenes",
+        sa.Column("id_salida", sa.Integer(), sa.ForeignKey("salidas.id_salida"), primary_key=True),
+        sa.Column("id_almacen", sa.Integer(), sa.ForeignKey("almacenes.id_almacen"), primary_key=True),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+    )
+    for name in ROLLUP_TABLES:
+        op.create_table(
+            name,
+            sa.Column("bucket", sa.DateTime(), primary_key=True),
+            sa.Column("id_producto", sa.Integer(), primary_key=True),
+            sa.Column("id_almacen", sa.Integer(), primary_key=True),
+            sa.Column("unidades_entrada", sa.Integer(), nullable=False),
+            sa.Column("unidades_salida", sa.Integer(), nullable=False),
+            sa.Column("entradas", sa.Integer(), nullable=False),
+            sa.Column("salidas", sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    for name in ROLLUP_TABLES:
+        op.drop_table(name)
+    op.drop_table("salidas_almacenes")
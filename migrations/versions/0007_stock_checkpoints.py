@@ -0,0 +1,36 @@
+"""checkpoints de stock para consultas as_of
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stock_checkpoints",
+        sa.Column("id_checkpoint", sa.Integer(), primary_key=True),
+        sa.Column("fecha", sa.DateTime(), nullable=False),
+        sa.Column("filas", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_stock_checkpoints_fecha", "stock_checkpoints", ["fecha"])
+    op.create_table(
+        "stock_checkpoint_filas",
+        sa.Column("id_checkpoint", sa.Integer(), sa.ForeignKey("stock_checkpoints.id_checkpoint"), primary_key=True),
+        sa.Column("id_producto", sa.Integer(), primary_key=True),
+        sa.Column("id_almacen", sa.Integer(), primary_key=True),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("stock_checkpoint_filas")
+    op.drop_index("ix_stock_checkpoints_fecha", table_name="stock_checkpoints")
+    op.drop_table("stock_checkpoints")
@@ -0,0 +1,35 @@
+"""saldos del libro de movimientos y marca de agua de la conciliación
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "saldos_libro",
+        sa.Column("id_producto", sa.Integer(), primary_key=True),
+        sa.Column("id_almacen", sa.Integer(), primary_key=True),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+    )
+    estado = op.create_table(
+        "reconciliacion_estado",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ultima_entrada", sa.Integer(), nullable=False),
+        sa.Column("ultima_salida", sa.Integer(), nullable=False),
+        sa.Column("fecha_ejecucion", sa.DateTime(), nullable=True),
+    )
+    op.bulk_insert(estado, [{"id": 1, "ultima_entrada": 0, "ultima_salida": 0, "fecha_ejecucion": None}])
+
+
+def downgrade():
+    op.drop_table("reconciliacion_estado")
+    op.drop_table("saldos_libro")
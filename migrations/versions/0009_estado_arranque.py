@@ -0,0 +1,29 @@
+"""estado del arranque: esquema y datos iniciales ya aplicados
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sin fila: el siguiente arranque la escribe tras sembrar
+    op.create_table(
+        "estado_arranque",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("huella_esquema", sa.String(), nullable=False),
+        sa.Column("revision", sa.String(), nullable=False),
+        sa.Column("version_datos", sa.Integer(), nullable=False),
+        sa.Column("fecha", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("estado_arranque")
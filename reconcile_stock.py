@@ -0,0 +1,32 @@
+import argparse
+import json
+import sys
+import os
+
+# Add the current directory to sys.path to make sure we can import app
+sys.path.append(os.getcwd())
+
+from sqlmodel import Session
+from app.database import engine
+from app.reconciliation import RECONCILE_BATCH_SIZE, adopt_stock, reconcile
+
+def main():
+    parser = argparse.ArgumentParser(description="Concilia el stock con el libro de entradas y salidas")
+    parser.add_argument("--reparar", action="store_true", help="lleva el stock descuadrado al valor del libro")
+    parser.add_argument("--completo", action="store_true", help="revisa todos los pares, no solo los de movimientos nuevos")
+    parser.add_argument("--lote", type=int, default=RECONCILE_BATCH_SIZE, help="movimientos o pares por lote")
+    parser.add_argument("--adoptar-stock", action="store_true", help="toma el stock actual como saldo de apertura (con la API parada)")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        if args.adoptar_stock:
+            adopt_stock(session)
+            print("Stock actual adoptado como saldo de apertura del libro.")
+            return
+        report = reconcile(session, repair=args.reparar, full=args.completo, batch_size=args.lote)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report["descuadres"] > report["reparados"] or any(not t["reparado"] for t in report["totales_descuadrados"]):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
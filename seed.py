@@ -8,6 +8,8 @@ from sqlmodel import Session, select
 from app.database import engine, init_db
 from app.models import Rol, Usuario, Producto, Almacen, Stock, Entrada, Salida
 from app.auth import get_password_hash
+from app.stock import add_stock
+from app.rollups import backfill_rollups
 from datetime import datetime
 
 def seed_data():
@@ -99,22 +101,16 @@ def seed_data():
         session.refresh(prod_monitor)
 
         print("Inicializando Stock...")
-        # Stock inicial en Bodega Central
-        stock_laptop = Stock(id_producto=prod_laptop.id_producto, id_almacen=almacen_central.id_almacen, cantidad=50)
-        stock_mouse = Stock(id_producto=prod_mouse.id_producto, id_almacen=almacen_central.id_almacen, cantidad=100)
-        stock_teclado = Stock(id_producto=prod_teclado.id_producto, id_almacen=almacen_central.id_almacen, cantidad=75)
-        stock_monitor = Stock(id_producto=prod_monitor.id_producto, id_almacen=almacen_central.id_almacen, cantidad=30)
-        
-        # Stock en Sucursal Norte
-        stock_laptop_norte = Stock(id_producto=prod_laptop.id_producto, id_almacen=almacen_norte.id_almacen, cantidad=10)
-        stock_mouse_norte = Stock(id_producto=prod_mouse.id_producto, id_almacen=almacen_norte.id_almacen, cantidad=20)
-
-        session.add(stock_laptop)
-        session.add(stock_mouse)
-        session.add(stock_teclado)
-        session.add(stock_monitor)
-        session.add(stock_laptop_norte)
-        session.add(stock_mouse_norte)
+        # Stock inicial en Bodega Central y Sucursal Norte. add_stock mantiene
+        # también el total materializado por producto.
+        add_stock(session, {
+            (prod_laptop.id_producto, almacen_central.id_almacen): 50,
+            (prod_mouse.id_producto, almacen_central.id_almacen): 100,
+            (prod_teclado.id_producto, almacen_central.id_almacen): 75,
+            (prod_monitor.id_producto, almacen_central.id_almacen): 30,
+            (prod_laptop.id_producto, almacen_norte.id_almacen): 10,
+            (prod_mouse.id_producto, almacen_norte.id_almacen): 20,
+        })
         session.commit()
 
         print("Registrando Entradas Iniciales (Histórico)...")
@@ -137,6 +133,10 @@ def seed_data():
         session.add(entrada2)
         session.commit()
 
+        print("Calculando resúmenes de movimientos...")
+        backfill_rollups(session)
+        session.commit()
+
         print("Base de datos poblada exitosamente!")
 
 if __name__ == "__main__":
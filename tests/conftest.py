@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+# La app lee DATABASE_URL al importarse: base temporal antes de cualquier
+# import de app. Los hashes en línea evitan el pool de procesos de bcrypt.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["HASH_WORKERS"] = "0"
+
+import itertools
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from app.database import engine
+from app.main import app
+from app.models import Almacen, Producto
+
+_ids = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    # Arranque real: migra y siembra el administrador una vez por sesión
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/auth/login", data={"username": "admin@inventrack.com", "password": "admin123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def session(client):
+    with Session(engine) as db_session:
+        yield db_session
+
+@pytest.fixture
+def product(session):
+    # Producto nuevo por test: la base se comparte en toda la sesión
+    n = next(_ids)
+    db_product = Producto(barcode=f"TEST{n:06d}", nombre=f"Producto de prueba {n}", precio=1.0)
+    session.add(db_product)
+    session.commit()
+    return db_product.id_producto
+
+@pytest.fixture
+def warehouse(session):
+    db_warehouse = Almacen(nombre=f"Almacén de prueba {next(_ids)}")
+    session.add(db_warehouse)
+    session.commit()
+    return db_warehouse.id_almacen
@@ -0,0 +1,23 @@
+import sqlite3
+import pytest
+from sqlalchemy import delete
+from sqlmodel import select
+from app.database import engine
+from app.models import AlertaStock
+from app.stock import ALERT_KEYS_PER_STATEMENT, add_stock, refresh_alerts
+
+@pytest.mark.skipif(engine.dialect.name != "sqlite", reason="límite de parámetros de SQLite")
+def test_refresh_alerts_beyond_sqlite_variable_limit(session, product, warehouse):
+    # Cada clave son dos parámetros: con una sola sentencia esto supera el límite
+    limit = sqlite3.connect(":memory:").getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    count = limit // 2 + 1
+    assert count > ALERT_KEYS_PER_STATEMENT
+    key = (product, warehouse)
+    add_stock(session, {key: 0})
+    session.execute(delete(AlertaStock).where(AlertaStock.id_producto == product))
+
+    refresh_alerts(session, [(p, 10**6) for p in range(1, count)] + [key])
+    session.commit()
+
+    alerts = session.exec(select(AlertaStock.id_almacen).where(AlertaStock.id_producto == product)).all()
+    assert alerts == [warehouse]
@@ -0,0 +1,63 @@
+import asyncio
+from app.auth import create_access_token
+from app.cache import TTLCache
+from app.deps import _resolve_principal, invalidate_principal, principal_cache
+
+def test_set_after_invalidation_is_discarded():
+    cache = TTLCache("test-stale", maxsize=10, ttl=60)
+    token = cache.token()
+    # Un update invalida mientras la lectura anterior sigue en curso
+    cache.invalidate("A")
+    cache.set("A", "viejo", token=token)
+    assert cache.get("A") is None
+    cache.set("A", "nuevo", token=cache.token())
+    assert cache.get("A") == "nuevo"
+
+def test_invalidation_of_other_keys_does_not_discard():
+    cache = TTLCache("test-other", maxsize=10, ttl=60)
+    token = cache.token()
+    cache.invalidate("B")
+    cache.set("A", "valor", token=token)
+    assert cache.get("A") == "valor"
+
+def test_forgotten_invalidations_still_discard():
+    # Con más invalidaciones que maxsize, las marcas antiguas se olvidan
+    cache = TTLCache("test-forgotten", maxsize=2, ttl=60)
+    token = cache.token()
+    for key in ("A", "B", "C", "D"):
+        cache.invalidate(key)
+    cache.set("A", "viejo", token=token)
+    assert cache.get("A") is None
+
+def test_clear_discards_pending_sets():
+    cache = TTLCache("test-clear", maxsize=10, ttl=60)
+    token = cache.token()
+    cache.clear()
+    cache.set("A", "viejo", token=token)
+    assert cache.get("A") is None
+
+class _ReadThenUpdate:
+    # Sesión mínima para _resolve_principal: devuelve la fila vieja y, antes
+    # de que se guarde en caché, un update del usuario hace commit e invalida
+    def __init__(self, row, on_read):
+        self.row = row
+        self.on_read = on_read
+
+    async def exec(self, statement):
+        self.on_read()
+        return self
+
+    def first(self):
+        return self.row
+
+def test_principal_read_before_invalidation_is_not_cached():
+    user_id = 987654
+    principal_cache.invalidate(user_id)
+    token = create_access_token(user_id)
+    session = _ReadThenUpdate((user_id, "Administrador"), lambda: invalidate_principal(user_id))
+
+    principal = asyncio.run(_resolve_principal(token, session))
+
+    # La petición en curso usa lo que leyó, pero el rol degradado no queda en caché
+    assert principal.nombre_rol == "Administrador"
+    assert principal_cache.get(user_id) is None
@@ -0,0 +1,31 @@
+import pytest
+from starlette.requests import Request
+from app.catalog import _accepts_gzip
+
+def _request(accept_encoding):
+    headers = [] if accept_encoding is None else [(b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/products/", "query_string": b"", "headers": headers})
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", True),
+    ("gzip;q=0.5", True),
+    ("br, *", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.0, deflate", False),
+    ("*;q=0", False),
+    ("gzip;q=0, *", False),
+    ("identity", False),
+    ("", False),
+    (None, False),
+])
+def test_accepts_gzip_honors_q_values(header, expected):
+    assert _accepts_gzip(_request(header)) is expected
+
+def test_listing_refused_gzip_is_sent_plain(client, admin_headers):
+    refused = client.get("/products/", headers={**admin_headers, "Accept-Encoding": "gzip;q=0"})
+    assert refused.status_code == 200
+    assert "content-encoding" not in refused.headers
+    assert not refused.headers["etag"].endswith('-gz"')
+    accepted = client.get("/products/", headers={**admin_headers, "Accept-Encoding": "gzip"})
+    assert accepted.headers["content-encoding"] == "gzip"
+    assert accepted.headers["etag"] == refused.headers["etag"][:-1] + '-gz"'
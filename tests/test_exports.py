@@ -0,0 +1,35 @@
+import gzip
+import json
+from app.database import engine
+from app.exports import CHUNK_SIZE, close_stream, stock_query, stream_rows
+from app.models import Almacen
+from app.stock import add_stock
+
+def test_stream_rows_is_lazy_and_releases_connection_on_close(session, product):
+    # Más de un bloque, para que el cliente pueda irse a mitad del stream
+    warehouses = [Almacen(nombre=f"Export {product}-{i}") for i in range(CHUNK_SIZE + 1)]
+    session.add_all(warehouses)
+    session.flush()
+    add_stock(session, {(product, w.id_almacen): 1 for w in warehouses})
+    session.commit()
+    session.close()
+    checked_out = engine.pool.checkedout()
+
+    body = stream_rows(stock_query())
+    # Sin pedir bloques no hay consulta ni conexión
+    assert engine.pool.checkedout() == checked_out
+    next(body)
+    assert engine.pool.checkedout() == checked_out + 1
+
+    # Desconexión a mitad del stream: la tarea de fondo lo cierra
+    close_stream(body)
+    assert engine.pool.checkedout() == checked_out
+
+def test_export_endpoints_stream_complete_files(client, admin_headers):
+    response = client.get("/inventory/export/csv", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.text.startswith("ID Stock,Producto,Almacen,Cantidad")
+    response = client.get("/inventory/export/entries?formato=ndjson&gzip=true", headers=admin_headers)
+    assert response.status_code == 200
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert lines and all("id_entrada" in json.loads(line) for line in lines)
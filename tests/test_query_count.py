@@ -0,0 +1,79 @@
+import itertools
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+from app.database import async_engine, engine
+from app.models import Almacen, Entrada, Producto, Rol, Salida, Stock, Usuario
+
+# Listados que deben costar las mismas consultas con N filas que con 10·N
+ENDPOINTS = [
+    "/inventory/stock?limit=1000",
+    "/inventory/movements/entries?limit=1000",
+    "/inventory/movements/exits?limit=1000",
+    "/users/?limit=1000",
+    "/inventory/export/csv",
+]
+N = 20
+
+_seq = itertools.count(1)
+
+@contextmanager
+def count_statements():
+    # El mismo evento que usa app/metrics.py, en los dos engines
+    counter = {"statements": 0}
+
+    def before_cursor_execute(*args):
+        counter["statements"] += 1
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+def seed(session, rows: int):
+    # Cada fila con su propio producto, almacén, usuario y rol: las
+    # relaciones cargadas crecen con las filas
+    for _ in range(rows):
+        n = next(_seq)
+        product = Producto(barcode=f"QC{n:06d}", nombre=f"Consultas {n}", precio=1.0)
+        role = Rol(nombre_rol=f"Consultas {n}")
+        session.add_all([product, role])
+        session.flush()
+        warehouse = Almacen(nombre=f"Consultas {n}", id_producto=product.id_producto)
+        user = Usuario(email=f"consultas{n}@inventrack.test", contraseña="x", nombre=f"Consultas {n}", id_rol=role.id_rol)
+        session.add_all([warehouse, user])
+        session.flush()
+        session.add_all([
+            Stock(id_producto=product.id_producto, id_almacen=warehouse.id_almacen, cantidad=1),
+            Entrada(id_usuario=user.id_usuario, id_almacen=warehouse.id_almacen, id_producto=product.id_producto, cantidad=1),
+            Salida(id_usuario=user.id_usuario, id_producto=product.id_producto, cantidad=1),
+        ])
+    session.commit()
+
+def statements(client, headers, url: str) -> int:
+    # Primera petición aparte: llena la caché de principal y otras
+    client.get(url, headers=headers)
+    with count_statements() as counter:
+        response = client.get(url, headers=headers)
+        response.read()
+    assert response.status_code == 200
+    return counter["statements"]
+
+@pytest.fixture(scope="module")
+def counts(client, admin_headers):
+    with Session(engine) as session:
+        seed(session, N)
+        small = {url: statements(client, admin_headers, url) for url in ENDPOINTS}
+        seed(session, 9 * N)
+        large = {url: statements(client, admin_headers, url) for url in ENDPOINTS}
+    return small, large
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_query_count_does_not_grow_with_rows(counts, url):
+    small, large = counts
+    assert small[url] == large[url]
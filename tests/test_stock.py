@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlmodel import func, select
+from app.models import Salida, Stock, StockTotal
+from app.stock import add_stock, remove_stock
+
+def _stock(session, id_producto):
+    session.expire_all()
+    rows = session.exec(select(func.coalesce(func.sum(Stock.cantidad), 0)).where(Stock.id_producto == id_producto)).one()
+    total = session.exec(select(StockTotal.cantidad).where(StockTotal.id_producto == id_producto)).first()
+    return rows, total
+
+def test_exit_rejects_non_positive_quantity(client, admin_headers, session, product, warehouse):
+    client.post("/inventory/entry", json={"id_producto": product, "id_almacen": warehouse, "cantidad": 3}, headers=admin_headers)
+    for cantidad in (-50, 0):
+        response = client.post("/inventory/exit", json={"id_producto": product, "cantidad": cantidad}, headers=admin_headers)
+        assert response.status_code == 422
+    assert _stock(session, product) == (3, 3)
+    assert session.exec(select(Salida).where(Salida.id_producto == product)).first() is None
+
+def test_remove_stock_rejects_negative_quantity(session, product):
+    with pytest.raises(ValueError):
+        remove_stock(session, product, -50)
+    session.rollback()
+
+def test_entry_rejects_non_positive_quantity(client, admin_headers, session, product, warehouse):
+    for cantidad in (-500, 0):
+        response = client.post("/inventory/entry", json={"id_producto": product, "id_almacen": warehouse, "cantidad": cantidad}, headers=admin_headers)
+        assert response.status_code == 422
+    lines = [{"id_producto": product, "id_almacen": warehouse, "cantidad": 5}, {"id_producto": product, "id_almacen": warehouse, "cantidad": -5}]
+    assert client.post("/inventory/entries/batch", json=lines, headers=admin_headers).status_code == 422
+    assert _stock(session, product) == (0, None)
+
+def test_add_stock_rejects_negative_delta(session, product, warehouse):
+    with pytest.raises(ValueError):
+        add_stock(session, {(product, warehouse): -1})
+    session.rollback()
+
+def test_concurrent_exits_never_oversell(client, admin_headers, session, product):
+    # 3 almacenes con 100 unidades y 200 salidas de 3 en paralelo: caben 100
+    initial = 0
+    for i in range(3):
+        warehouse = client.post("/warehouses/", json={"nombre": f"Concurrencia {product}-{i}"}, headers=admin_headers).json()
+        client.post("/inventory/entry", json={"id_producto": product, "id_almacen": warehouse["id_almacen"], "cantidad": 100}, headers=admin_headers)
+        initial += 100
+
+    def do_exit(_):
+        return client.post("/inventory/exit", json={"id_producto": product, "cantidad": 3}, headers=admin_headers).status_code
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(do_exit, range(200)))
+
+    assert set(statuses) <= {200, 400, 409}
+    sold = statuses.count(200) * 3
+    remaining, total = _stock(session, product)
+    assert sold <= initial
+    assert sold + remaining == initial
+    assert total == remaining
+    assert session.exec(select(func.min(Stock.cantidad)).where(Stock.id_producto == product)).one() >= 0
+
+def test_concurrent_entries_and_exits_on_same_product(client, admin_headers, session, product):
+    # Entradas y salidas mezcladas: add_stock y remove_stock bloquean total y
+    # filas en el mismo orden, ninguna petición acaba en deadlock (500)
+    warehouses = [
+        client.post("/warehouses/", json={"nombre": f"Mixto {product}-{i}"}, headers=admin_headers).json()["id_almacen"]
+        for i in range(3)
+    ]
+    for warehouse in warehouses:
+        client.post("/inventory/entry", json={"id_producto": product, "id_almacen": warehouse, "cantidad": 50}, headers=admin_headers)
+
+    def do_movement(i):
+        if i % 2:
+            body = {"id_producto": product, "id_almacen": warehouses[i % 3], "cantidad": 2}
+            return "entrada", client.post("/inventory/entry", json=body, headers=admin_headers).status_code
+        return "salida", client.post("/inventory/exit", json={"id_producto": product, "cantidad": 3}, headers=admin_headers).status_code
+
+    # Concurrencia moderada: SQLite admite un solo escritor y con muchos
+    # en cola la espera supera busy_timeout ("database is locked")
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(do_movement, range(120)))
+
+    assert all(status == 200 for kind, status in results if kind == "entrada")
+    assert {status for kind, status in results if kind == "salida"} <= {200, 400, 409}
+    entered = 2 * sum(1 for kind, _ in results if kind == "entrada")
+    sold = 3 * sum(1 for kind, status in results if kind == "salida" and status == 200)
+    remaining, total = _stock(session, product)
+    assert remaining == 150 + entered - sold
+    assert total == remaining